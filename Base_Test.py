@@ -1,44 +1,73 @@
+from operator import attrgetter
+
 import pandas as pd
+from pydantic import TypeAdapter
 from typing import List, Generator, Tuple, Any
 
 from selenium.webdriver.chrome import webdriver
 
 from Contracts.Contract_TestCases import TestExecution
 from Utilities.File_IO import DataFileImport
+from Utilities.Input_Cache import INPUT_CACHE_ENABLED, ParsedInputCache
 from Utilities.Data_Structures import SiteEnv, SiteUpdateStatus, Site, ComparisonResult, TestResult
 
+# Validates every mapped site in one call instead of one model construction per site
+SITE_LIST_ADAPTER = TypeAdapter(List[Site])
+
 
 class ExtractSite:
+    # Order the envs of a site are grouped in
+    ENVIRONMENTS = (SiteEnv.PRODUCTION, SiteEnv.DEVELOPMENT, SiteEnv.STAGE)
+
     @staticmethod
     def read_excel_data(file_path: str) -> pd.DataFrame:
         try:
-            return pd.read_excel(file_path)
+            if not INPUT_CACHE_ENABLED:
+                return pd.read_excel(file_path)
+            input_cache = ParsedInputCache.shared()
+            data_df = input_cache.get_frame(file_path)
+            if data_df is None:
+                data_df = pd.read_excel(file_path)
+                input_cache.set_frame(file_path, data_df)
+            return data_df
         except Exception as e:
             print(f"Error reading data from {file_path}: {e}")
             return pd.DataFrame()
 
     @staticmethod
     def map_data_to_sites(data_df: pd.DataFrame, data1_rows: List[DataFileImport]) -> list[Any]:
+        if data_df.empty or not data1_rows:
+            return []
+        env_columns = [env.value for env in ExtractSite.ENVIRONMENTS]
+
+        # First flags row per name wins; names without flags are skipped
+        flags_df = pd.DataFrame({column: list(map(attrgetter(column), data1_rows))
+                                 for column in ['name'] + env_columns}).drop_duplicates('name')
+        merged = data_df[['name'] + env_columns].reset_index(drop=True).rename_axis('position').reset_index().merge(
+            flags_df, on='name', how='inner', suffixes=('', '_flag'))
+        update_status = merged['prod_flag'].eq(1).map(
+            {True: SiteUpdateStatus.UPDATED.value, False: SiteUpdateStatus.PRE_UPDATE.value})
+
+        # One row per (site row, env) whose flag is 0 or 1, in sheet order and prod/dev/stage within a row
+        env_frames = []
+        for rank, env in enumerate(ExtractSite.ENVIRONMENTS):
+            selected = merged[f'{env.value}_flag'].isin([0, 1])
+            env_frames.append(pd.DataFrame({
+                'position': merged.loc[selected, 'position'],
+                'rank': rank,
+                'name': merged.loc[selected, 'name'],
+                'url': merged.loc[selected, env.value],
+                'update_status': update_status[selected]
+            }))
+        sites_df = pd.concat(env_frames, ignore_index=True).sort_values(['position', 'rank'], kind='stable')
+
+        sites = SITE_LIST_ADAPTER.validate_python([
+            {'name': name, 'env': env_columns[rank], 'url': url, 'update_status': us}
+            for name, rank, url, us in zip(sites_df['name'].tolist(), sites_df['rank'].tolist(),
+                                           sites_df['url'].tolist(), sites_df['update_status'].tolist())])
         sites_dict = {}
-
-        for _, row in data_df.iterrows():
-            name, prod, dev, stage = row['name'], row[SiteEnv.PRODUCTION], row[SiteEnv.DEVELOPMENT], row[SiteEnv.STAGE]
-
-            # Find the corresponding row in data1_rows
-            data1_row = next((r for r in data1_rows if r.name == name), None)
-            us = SiteUpdateStatus.UPDATED \
-                if data1_row.prod == 1 else SiteUpdateStatus.PRE_UPDATE
-
-            if data1_row:
-                if data1_row.prod in [0, 1]:
-                    sites_dict.setdefault(name, []).append(
-                        Site(name=name, env=SiteEnv.PRODUCTION, url=prod, update_status=us))
-                if data1_row.dev in [0, 1]:
-                    sites_dict.setdefault(name, []).append(
-                        Site(name=name, env=SiteEnv.DEVELOPMENT, url=dev, update_status=us))
-                if data1_row.stage in [0, 1]:
-                    sites_dict.setdefault(name, []).append(
-                        Site(name=name, env=SiteEnv.STAGE, url=stage, update_status=us))
+        for site in sites:
+            sites_dict.setdefault(site.name, []).append(site)
         return list(sites_dict.values())
 
     def read_and_map_sites(self, data_file_path: str) -> list[Any]:
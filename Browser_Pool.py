@@ -0,0 +1,149 @@
+import atexit
+import os
+import queue
+import threading
+import weakref
+from typing import Callable, Dict, List
+from urllib.parse import urlsplit
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+# Number of warm drivers kept per process and how many sites one driver may serve before it is replaced
+BROWSER_POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", 1))
+BROWSER_MAX_USES = int(os.environ.get("BROWSER_MAX_USES", 25))
+
+# Everything an origin can persist in the profile: local/session storage, IndexedDB, cache storage, service workers
+CLEAR_STORAGE_TYPES = "all"
+
+
+def create_driver() -> webdriver.Chrome:
+    options = Options()
+    options.page_load_strategy = 'normal'
+    options.set_capability('goog:perfLoggingPrefs', {"enableNetwork": True, "enablePage": True})
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL', 'browser': 'ALL'})
+    # options.add_argument('--headless=new')
+    driver = webdriver.Chrome(options=options)
+    driver.maximize_window()
+    return driver
+
+
+class BrowserPool:
+    _shared = None
+    _visited_origins = weakref.WeakKeyDictionary()  # driver -> origins loaded since its last reset
+    _reset_callbacks: List[Callable[[], None]] = []  # Run whenever a released driver leaves the page it was on
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, max_uses: int = BROWSER_MAX_USES,
+                 factory: Callable[[], webdriver.Chrome] = create_driver):
+        self.size = size
+        self.max_uses = max_uses
+        self.factory = factory
+        self._idle = queue.LifoQueue()
+        self._uses: Dict[webdriver.Chrome, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "BrowserPool":
+        if cls._shared is None:
+            cls._shared = cls()
+            atexit.register(cls.shutdown_shared)
+        return cls._shared
+
+    @classmethod
+    def record_visit(cls, driver: webdriver.Chrome, *urls: str):
+        origins = cls._visited_origins.setdefault(driver, set())
+        for url in urls:
+            parts = urlsplit(url or "")
+            if parts.scheme in ("http", "https") and parts.netloc:
+                origins.add(f"{parts.scheme}://{parts.netloc}")
+
+    @classmethod
+    def add_reset_callback(cls, callback: Callable[[], None]):
+        cls._reset_callbacks.append(callback)
+
+    @classmethod
+    def shutdown_shared(cls):
+        if cls._shared is not None:
+            cls._shared.close()
+            cls._shared = None
+
+    def acquire(self) -> webdriver.Chrome:
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = len(self._uses) < self.size
+                if can_create:
+                    driver = self._start()
+                else:
+                    try:
+                        driver = self._idle.get(timeout=1)
+                    except queue.Empty:
+                        continue
+            if self.is_alive(driver):
+                return driver
+            self._discard(driver)
+
+    def release(self, driver: webdriver.Chrome, crashed: bool = False):
+        with self._lock:
+            self._uses[driver] = self._uses.get(driver, 0) + 1
+            worn_out = self._uses[driver] >= self.max_uses
+        reusable = not crashed and not worn_out and self.reset_state(driver)
+        # State cached for the page the driver was on is stale once it is reset or discarded
+        for callback in self._reset_callbacks:
+            callback()
+        if reusable:
+            self._idle.put(driver)
+        else:
+            self._discard(driver)
+
+    @staticmethod
+    def is_alive(driver: webdriver.Chrome) -> bool:
+        try:
+            driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    @classmethod
+    def reset_state(cls, driver: webdriver.Chrome) -> bool:
+        try:
+            # Clearing through the page would only reach the last origin; CDP clears every origin the driver loaded
+            for origin in cls._visited_origins.pop(driver, set()):
+                driver.execute_cdp_cmd('Storage.clearDataForOrigin',
+                                       {'origin': origin, 'storageTypes': CLEAR_STORAGE_TYPES})
+            driver.delete_all_cookies()
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            driver.get('about:blank')
+            # Drain buffered logs so the next site only sees its own entries
+            for log_type in ('browser', 'driver', 'performance'):
+                try:
+                    driver.get_log(log_type)
+                except WebDriverException:
+                    pass
+            return True
+        except WebDriverException:
+            return False
+
+    def close(self):
+        with self._lock:
+            drivers = list(self._uses)
+        for driver in drivers:
+            self._discard(driver)
+
+    def _start(self) -> webdriver.Chrome:
+        driver = self.factory()
+        with self._lock:
+            self._uses[driver] = 0
+        return driver
+
+    def _discard(self, driver: webdriver.Chrome):
+        with self._lock:
+            self._uses.pop(driver, None)
+        self._visited_origins.pop(driver, None)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
@@ -1,49 +1,148 @@
+import importlib.util
 import json
 import os
 from concurrent.futures import ThreadPoolExecutor
-from typing import List
+from typing import Callable, Iterator, List, Optional
 
-import numpy as np
+import openpyxl
 import pandas as pd
-from pydantic import ValidationError
+from pandas._libs.parsers import STR_NA_VALUES
+from pydantic import TypeAdapter, ValidationError
+
+from Utilities.Input_Cache import INPUT_CACHE_ENABLED, ParsedInputCache
+
+# Rows per chunk of a streaming import
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 10000))
+
+# calamine (Rust) parses xlsx several times faster than openpyxl when python-calamine is installed
+EXCEL_ENGINE = os.environ.get(
+    "EXCEL_ENGINE", "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl")
 
 
 class FileReader:
-    def read(self, file_path: str) -> pd.DataFrame:
+    def read(self, file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        # columns limits parsing to those headers; missing ones are left for validate_headers to report
+        try:
+            return self._read_file(file_path, columns)
+        except Exception as e:
+            raise ValueError(f"Error reading {self.__class__.__name__}: {e}")
+
+    def read_header(self, file_path: str) -> List[str]:
+        # Every column name of the file, whichever columns a read is limited to
         try:
-            return self._read_file(file_path)
+            return list(self._read_header(file_path))
         except Exception as e:
             raise ValueError(f"Error reading {self.__class__.__name__}: {e}")
 
-    def _read_file(self, file_path: str) -> pd.DataFrame:
+    def iter_chunks(self, file_path: str, chunksize: int = IMPORT_CHUNK_SIZE,
+                    columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        # Chunks keep a continuous index, so error rows are numbered as in a full read
+        try:
+            yield from self._iter_file_chunks(file_path, chunksize, columns)
+        except Exception as e:
+            raise ValueError(f"Error reading {self.__class__.__name__}: {e}")
+
+    @staticmethod
+    def column_filter(columns: Optional[List[str]]) -> Optional[Callable[[str], bool]]:
+        if columns is None:
+            return None
+        wanted = set(columns)
+        return lambda column: column in wanted
+
+    def _read_file(self, file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
         raise NotImplementedError
 
+    def _read_header(self, file_path: str) -> List[str]:
+        return self._read_file(file_path).columns
+
+    def _iter_file_chunks(self, file_path: str, chunksize: int,
+                          columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        df = self._read_file(file_path, columns)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
 
 class ExcelFileReader(FileReader):
-    def _read_file(self, file_path: str) -> pd.DataFrame:
-        return pd.read_excel(file_path, engine='openpyxl')
+    def _read_file(self, file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        if columns is not None and EXCEL_ENGINE == 'openpyxl':
+            # pandas' openpyxl path builds every cell of the sheet before usecols drops the unused ones
+            chunks = list(self._iter_file_chunks(file_path, IMPORT_CHUNK_SIZE, columns))
+            if chunks:
+                return pd.concat(chunks)
+        return pd.read_excel(file_path, engine=EXCEL_ENGINE, usecols=self.column_filter(columns))
+
+    def _read_header(self, file_path: str) -> List[str]:
+        return pd.read_excel(file_path, engine=EXCEL_ENGINE, nrows=0).columns
+
+    def _iter_file_chunks(self, file_path: str, chunksize: int,
+                          columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        # read_only streams rows from the sheet XML instead of loading every cell up front
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = list(next(rows, ()))
+            keep = self.column_filter(columns) or (lambda column: True)
+            positions = [position for position, column in enumerate(header) if keep(column)]
+            names = [header[position] for position in positions]
+            chunk, start, blank_rows = [], 0, []
+            for row in rows:
+                values = tuple(row[position] if position < len(row) else None for position in positions)
+                # Blank rows are kept like pandas does, except trailing ones
+                if all(value is None for value in values):
+                    blank_rows.append(values)
+                    continue
+                chunk.extend(blank_rows)
+                blank_rows = []
+                # Text pandas reads as missing ("N/A", "NA", "null", ...) is missing here too
+                chunk.append(tuple(None if isinstance(value, str) and value in STR_NA_VALUES else value
+                                   for value in values))
+                if len(chunk) >= chunksize:
+                    yield pd.DataFrame(chunk, columns=names, index=range(start, start + len(chunk)))
+                    chunk, start = [], start + len(chunk)
+            if chunk:
+                yield pd.DataFrame(chunk, columns=names, index=range(start, start + len(chunk)))
+        finally:
+            workbook.close()
 
 
 class CSVFileReader(FileReader):
-    def _read_file(self, file_path: str) -> pd.DataFrame:
-        return pd.read_csv(file_path, low_memory=False)
+    # Cells are kept as the strings in the file and converted by the model. Inferred dtypes would depend on
+    # which rows share a chunk, so a full read and a streamed read could validate different values.
+    CELL_DTYPE = object
+
+    def _read_file(self, file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return pd.read_csv(file_path, low_memory=False, dtype=self.CELL_DTYPE, usecols=self.column_filter(columns))
+
+    def _iter_file_chunks(self, file_path: str, chunksize: int,
+                          columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        with pd.read_csv(file_path, chunksize=chunksize, dtype=self.CELL_DTYPE,
+                         usecols=self.column_filter(columns)) as chunks:
+            yield from chunks
+
+    def _read_header(self, file_path: str) -> List[str]:
+        return pd.read_csv(file_path, nrows=0).columns
 
 
 class JSONFileReader(FileReader):
-    def _read_file(self, file_path: str) -> pd.DataFrame:
+    def _read_file(self, file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
         with open(file_path, 'r') as f:
             data = json.load(f)
-            return pd.DataFrame(data)
+            df = pd.DataFrame(data)
+        return df if columns is None else df[[column for column in df.columns if column in set(columns)]]
 
 
 class Validator:
+    _list_adapters = {}  # ModelClass -> TypeAdapter(List[ModelClass]), built once per model
 
     @classmethod
-    def validate_headers(cls, df: pd.DataFrame, expected_columns: List[str]) -> pd.DataFrame:
+    def validate_headers(cls, df: pd.DataFrame, expected_columns: List[str],
+                         file_header: Optional[List[str]] = None) -> pd.DataFrame:
+        # file_header is the file's full header row, for frames read with only the model's columns
         actual_columns = set(df.columns)
         if not set(expected_columns).issubset(actual_columns):
+            found_columns = file_header if file_header is not None else actual_columns
             raise ValueError(
-                f"Invalid headers in the file. Expected columns: {expected_columns}, Found columns: {actual_columns}")
+                f"Invalid headers in the file. Expected columns: {expected_columns}, Found columns: {found_columns}")
         return df[expected_columns]
 
     @classmethod
@@ -56,6 +155,23 @@ class Validator:
         errors = [error for result in results for error in (result[1] or [])]
         return valid_data, errors
 
+    @classmethod
+    def validate_inputs_batch(cls, df: pd.DataFrame, ModelClass):
+        if ModelClass not in cls._list_adapters:
+            cls._list_adapters[ModelClass] = TypeAdapter(List[ModelClass])
+        adapter = cls._list_adapters[ModelClass]
+        records = df.to_dict('records')
+        try:
+            return adapter.validate_python(records), []
+        except ValidationError as e:
+            failed = sorted({error['loc'][0] for error in e.errors()})
+
+        # Rows that passed are validated again as one batch; only failing rows go through validate_row for details
+        failed_set = set(failed)
+        valid_data = adapter.validate_python([record for index, record in enumerate(records) if index not in failed_set])
+        errors = [error for index in failed for error in (cls.validate_row(df.iloc[index], ModelClass)[1] or [])]
+        return valid_data, errors
+
     @staticmethod
     def validate_row(row, ModelClass):
         try:
@@ -87,21 +203,56 @@ class FileImporter:
     def __init__(self, file_path=None):
         self.file_path = file_path
 
+    def get_reader(self, filepath):
+        if not filepath:
+            raise ValueError("Filepath is required for import_file")
+
+        file_extension = os.path.splitext(filepath)[1].lower()
+        reader = self._file_readers.get(file_extension)
+
+        if reader is None:
+            raise ValueError(f"Unsupported file format {file_extension}. Please upload a supported file type.")
+        return reader
+
+    @staticmethod
+    def validate_frame(df: pd.DataFrame, cls, file_header: Optional[List[str]] = None):
+        # Missing cells become None whatever the column dtype, so full and chunked reads validate the same values
+        df = df.astype(object).where(df.notna(), None)
+        df = Validator.validate_headers(df, list(cls.__annotations__.keys()), file_header)
+        return Validator.validate_inputs_batch(df, cls)
+
+    @staticmethod
+    def file_header(reader: FileReader, filepath, df: pd.DataFrame, columns: List[str]) -> Optional[List[str]]:
+        # Reads only hold the model's columns; when one is missing, the error lists the file's real header row
+        return None if set(columns).issubset(df.columns) else reader.read_header(filepath)
+
+    def read_and_validate(self, reader: FileReader, filepath, cls):
+        columns = list(cls.__annotations__.keys())
+        df = reader.read(filepath, columns)
+        return self.validate_frame(df, cls, self.file_header(reader, filepath, df, columns))
+
     def __call__(self, cls):
         def wrapper(filepath=None, *args, **kwargs):
             filepath = filepath or self.file_path
-            if not filepath:
-                raise ValueError("Filepath is required for import_file")
+            reader = self.get_reader(filepath)
+            if not INPUT_CACHE_ENABLED:
+                return self.read_and_validate(reader, filepath, cls)
 
-            file_extension = os.path.splitext(filepath)[1].lower()
-            reader = self._file_readers.get(file_extension)
+            input_cache = ParsedInputCache.shared()
+            cached = input_cache.get_models(filepath, cls)
+            if cached is not None:
+                return cached
+            valid_data, errors = self.read_and_validate(reader, filepath, cls)
+            input_cache.set_models(filepath, cls, valid_data, errors)
+            return valid_data, errors
 
-            if reader is None:
-                raise ValueError(f"Unsupported file format {file_extension}. Please upload a supported file type.")
-
-            df = reader.read(filepath)
-            df = df.replace(np.nan, None)
-            df = Validator.validate_headers(df, list(cls.__annotations__.keys()))
-            return Validator.validate_inputs_parallel(df, cls)
+        def stream(filepath=None, chunksize=IMPORT_CHUNK_SIZE):
+            # Yields (models, errors) per chunk; only one chunk is held in memory at a time
+            filepath = filepath or self.file_path
+            columns = list(cls.__annotations__.keys())
+            reader = self.get_reader(filepath)
+            for chunk in reader.iter_chunks(filepath, chunksize, columns):
+                yield self.validate_frame(chunk, cls, self.file_header(reader, filepath, chunk, columns))
 
+        wrapper.stream = stream
         return wrapper
@@ -1,14 +1,137 @@
+import hashlib
+import json
 import os
+import re
 from abc import ABC, abstractmethod
 from selenium import webdriver
-from typing import List, Dict
+from selenium.common.exceptions import WebDriverException
+from typing import Any, Iterable, List, Dict, Optional, Tuple
+from urllib.parse import urlsplit
 
-from Utilities.Data_Structures import TestResult, ComparisonResult, Site
+from Utilities.Browser_Pool import BrowserPool
+from Utilities.Data_Structures import TestResult, ComparisonResult, Site, PageVisit, SiteEnv, TestStatus
 from Utilities.FilePath_Handler import OutputHandler
-from Utilities.Report_HTML import generate_html_report
+from Utilities.Report_HTML import generate_html_report, render_html_report
+
+# Reads every element matching a selector in one round trip; href is resolved like get_attribute('href').
+# SVG <a> elements expose href as an SVGAnimatedString, so only a string property is taken as the URL.
+EXTRACT_ELEMENTS_JS = """
+    return Array.from(document.querySelectorAll(arguments[0])).map(function (el) {
+        var rect = el.getBoundingClientRect();
+        var style = window.getComputedStyle(el);
+        return {
+            tag: el.tagName.toLowerCase(),
+            href: el.hasAttribute('href') ? ((typeof el.href === 'string' && el.href) || el.getAttribute('href')) : null,
+            text: (el.innerText || '').trim(),
+            rel: el.getAttribute('rel'),
+            visible: rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none'
+        };
+    });
+"""
+
+# Scheme and host of a URL. The site's own env hosts are replaced with SITE_HOST_PLACEHOLDER before
+# comparing payloads, since envs differ only by them; third-party hosts are kept.
+URL_HOST_PATTERN = re.compile(r"https?://([^/\s\"'?#]+)")
+SITE_HOST_PLACEHOLDER = "{site}"
+# Fields that change on every run, such as console log timestamps, and never count as a difference
+COMPARISON_IGNORED_KEYS = ("timestamp",)
+# Entries listed per env and diff kind; the counts always cover everything
+COMPARISON_MAX_ITEMS = int(os.environ.get("COMPARISON_MAX_ITEMS", 200))
+
+
+class ComparisonEngine:
+    def __init__(self, check_name: str, site_urls: Iterable[str] = (), baseline_env: str = SiteEnv.PRODUCTION.value,
+                 ignored_keys=COMPARISON_IGNORED_KEYS, max_items: int = COMPARISON_MAX_ITEMS):
+        self.check_name = check_name
+        self.site_hosts = {urlsplit(url).netloc.lower() for url in site_urls if url}
+        self.baseline_env = baseline_env
+        self.ignored_keys = set(ignored_keys)
+        self.max_items = max_items
+
+    def replace_site_host(self, match: re.Match) -> str:
+        return SITE_HOST_PLACEHOLDER if match.group(1).lower() in self.site_hosts else match.group(0)
+
+    def normalize(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return URL_HOST_PATTERN.sub(self.replace_site_host, value)
+        if isinstance(value, dict):
+            return {self.normalize(key): self.normalize(item) for key, item in value.items()
+                    if key not in self.ignored_keys}
+        if isinstance(value, (list, tuple)):
+            return [self.normalize(item) for item in value]
+        return value
+
+    @staticmethod
+    def fingerprint(value: Any) -> str:
+        return hashlib.blake2b(json.dumps(value, sort_keys=True, default=str).encode("utf-8"),
+                               digest_size=8).hexdigest()
+
+    def index_payload(self, payload: Any) -> Dict[str, Tuple[Any, Optional[str], Any]]:
+        # Fingerprint -> (key, value fingerprint, value): dicts diff by key, lists as sets, anything else as one value
+        payload = self.normalize(payload)
+        if isinstance(payload, dict):
+            return {self.fingerprint(key): (key, self.fingerprint(value), value) for key, value in payload.items()}
+        if isinstance(payload, list):
+            return {self.fingerprint(item): (item, None, None) for item in payload}
+        return {self.fingerprint(None): (None, self.fingerprint(payload), payload)}
+
+    def find_record(self, records: Optional[List[dict]]) -> Optional[dict]:
+        return next((record for record in records or [] if record["Name"] == self.check_name), None)
+
+    def diff(self, baseline: dict, current: dict) -> dict:
+        baseline_index = self.index_payload(baseline.get("Actual_Result"))
+        current_index = self.index_payload(current.get("Actual_Result"))
+        added = current_index.keys() - baseline_index.keys()
+        removed = baseline_index.keys() - current_index.keys()
+        changed = [key for key in current_index.keys() & baseline_index.keys()
+                   if current_index[key][1] != baseline_index[key][1]]
+        baseline_status = getattr(baseline["Status"], "value", baseline["Status"])
+        current_status = getattr(current["Status"], "value", current["Status"])
+        return {
+            "status": {"baseline": baseline_status, "env": current_status} if baseline_status != current_status
+            else None,
+            "added_count": len(added),
+            "removed_count": len(removed),
+            "changed_count": len(changed),
+            "added": [current_index[key][0] for key in list(added)[:self.max_items]],
+            "removed": [baseline_index[key][0] for key in list(removed)[:self.max_items]],
+            "changed": [{"key": current_index[key][0], "baseline": baseline_index[key][2],
+                         "env": current_index[key][2]} for key in changed[:self.max_items]]
+        }
+
+    def compare(self, results: Dict[str, List[dict]], description: str) -> ComparisonResult:
+        baseline = self.find_record(results.get(self.baseline_env))
+        if baseline is None:
+            return ComparisonResult(
+                Name=self.check_name,
+                Status=TestStatus.ERROR,
+                Description=f"{description}: no {self.baseline_env} result to compare against",
+                Expected_Result={}
+            )
+
+        env_diffs = {}
+        for env, records in results.items():
+            if env == self.baseline_env:
+                continue
+            current = self.find_record(records)
+            env_diffs[env] = self.diff(baseline, current) if current is not None else None
+
+        # New or changed entries and a status worse than prod are regressions; fixes are reported, not failed
+        regressed = [env for env, env_diff in env_diffs.items() if env_diff and (
+            (env_diff["status"] and env_diff["status"]["env"] != TestStatus.PASS.value)
+            or env_diff["added_count"] or env_diff["changed_count"])]
+        return ComparisonResult(
+            Name=self.check_name,
+            Status=TestStatus.FAIL if regressed else TestStatus.PASS,
+            Description=f"{description}: {', '.join(regressed)} differ from {self.baseline_env}" if regressed
+            else description,
+            Expected_Result=env_diffs
+        )
 
 
 class TestExecution(ABC):
+    _page_visit = None  # (site/env/session key, PageVisit) of the page every check is currently reading
+    aggregator = None  # AggregatorClient when results are streamed to a single-writer aggregation process
 
     def __init__(self, site_data: Site, driver: webdriver):
         self.site_data = site_data
@@ -16,6 +139,15 @@ class TestExecution(ABC):
         self.driver = driver
         self.run_execution()
 
+    @classmethod
+    def from_site_data(cls, site_data, driver: webdriver = None) -> "TestExecution":
+        # Builds a check without running it, e.g. to compare results collected by other processes
+        execution = cls.__new__(cls)
+        execution.site_data = site_data
+        execution.site = site_data[0]
+        execution.driver = driver
+        return execution
+
     @abstractmethod
     def run_test(self) -> TestResult:
         pass
@@ -26,13 +158,69 @@ class TestExecution(ABC):
 
     def run_execution(self):
         test_output = self.run_test()
+        if TestExecution.aggregator is not None:
+            TestExecution.aggregator.submit(self, test_output)
+            return
         self.save_test_result(test_output)
         if self.site_data[1] == self.site_data[2]:
-            self.save_test_comparison()
-            file_paths = OutputHandler.get_file_paths(self.site.name)
+            self.finish_site()
+
+    def finish_site(self):
+        self.save_test_comparison()
+        file_paths = OutputHandler.get_file_paths(self.site.name)
+        if 'comparison' in file_paths:
             generate_html_report(file_paths, self.site.name)
+        else:
+            comparison_data, env_results = OutputHandler.get_report_data(self.site.name)
+            render_html_report(comparison_data, env_results, self.site.name)
+
+    def extract_elements(self, selector: str) -> List[Dict]:
+        return self.driver.execute_script(EXTRACT_ELEMENTS_JS, selector) or []
+
+    def visit_page(self) -> PageVisit:
+        key = (self.site.name, self.site.env, self.site.url, self.driver.session_id)
+        if TestExecution._page_visit is None or TestExecution._page_visit[0] != key:
+            TestExecution._page_visit = (key, self.capture_page_visit())
+        return TestExecution._page_visit[1]
+
+    def capture_page_visit(self) -> PageVisit:
+        self.driver.get(self.site.url)
+        # The pool clears storage of every origin a driver loaded before it serves the next site
+        final_url = self.driver.current_url
+        BrowserPool.record_visit(self.driver, self.site.url, final_url)
+        return PageVisit(
+            url=self.site.url,
+            final_url=final_url,
+            dom=self.driver.page_source,
+            links=self.extract_elements("a[href]"),
+            browser_logs=self.read_log('browser'),
+            driver_logs=self.read_log('driver'),
+            performance_logs=self.read_log('performance')
+        )
+
+    @classmethod
+    def invalidate_page_visit(cls):
+        # The pool navigates released drivers to about:blank, so the cached visit no longer matches the page
+        TestExecution._page_visit = None
+
+    def capture_screenshot(self, check_name: str) -> str:
+        # Raw screenshot next to the env results; the report copies it into the run assets by content hash
+        screenshot_path = OutputHandler.get_env_dir(self.site.name, self.site.env) / f"{check_name}.png"
+        self.driver.save_screenshot(str(screenshot_path))
+        return str(screenshot_path)
+
+    def read_log(self, log_type: str) -> List[Dict]:
+        try:
+            return self.driver.get_log(log_type)
+        except WebDriverException:
+            return []
+
+    def compare_envs(self, results: Dict[str, List[dict]], check_name: str, description: str) -> ComparisonResult:
+        site_urls = OutputHandler.get_site_urls(self.site.name).values()
+        return ComparisonEngine(check_name, site_urls).compare(results, description)
 
     def save_test_result(self, test_output: TestResult):
+        OutputHandler.register_site(self.site)
         OutputHandler.save_test_result(self.site.name, self.site.env, test_output)
 
     def save_test_comparison(self):
@@ -41,3 +229,4 @@ class TestExecution(ABC):
         OutputHandler.save_comparison_result(self.site.name, comparison_result)
 
 
+BrowserPool.add_reset_callback(TestExecution.invalidate_page_visit)
@@ -1,5 +1,5 @@
 from enum import Enum, StrEnum, auto
-from typing import Optional, Any
+from typing import Optional, Any, List
 
 from pydantic import BaseModel
 
@@ -35,6 +35,7 @@ class TestResult(BaseModel):
     Status: TestStatus
     Description: Optional[str] = None
     Actual_Result: Optional[Any] = None
+    Image: Optional[str] = None
 
 
 class ComparisonResult(BaseModel):
@@ -44,5 +45,15 @@ class ComparisonResult(BaseModel):
     Expected_Result: Optional[Any] = None
 
 
+class PageVisit(BaseModel):
+    url: str
+    final_url: str
+    dom: str
+    links: List[dict] = []
+    browser_logs: List[dict] = []
+    driver_logs: List[dict] = []
+    performance_logs: List[dict] = []
+
+
 # x = TestResult(Status="pass", Name="test1", Description="test1 des", Actual_Result="data test1")
 # print(x.model_dump_json())
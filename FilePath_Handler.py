@@ -1,15 +1,128 @@
 import json
+import os
+import tempfile
 from datetime import datetime
 from pathlib import Path
-from Utilities.Data_Structures import TestResult, ComparisonResult
+from typing import Dict, Iterator, Optional, Tuple
+from Utilities.Data_Structures import TestResult, ComparisonResult, Site
+from Utilities.Result_Store import SQLiteResultBackend
 
 # Define the base directory for results
 RESULTS_BASE_DIR = Path("Result")
 
+# "jsonl" appends one record per result; "json" rewrites the whole env list on every save
+RESULTS_STORAGE_MODE = os.environ.get("RESULTS_STORAGE_MODE", "jsonl")
+JSONL_FLUSH_EVERY = int(os.environ.get("JSONL_FLUSH_EVERY", 20))
+COMPARISON_FLUSH_BATCH = int(os.environ.get("COMPARISON_FLUSH_BATCH", 50))
+
+# Where results go: "json" is the Result/<site>/<run>/<env> file tree, "sqlite" the indexed database
+RESULTS_BACKENDS = [backend.strip() for backend in os.environ.get("RESULTS_BACKENDS", "json").split(",")]
+
+
+class RunContext:
+    _current = None
+
+    def __init__(self, run_id: Optional[str] = None, base_dir: Path = RESULTS_BASE_DIR):
+        # Worker processes inherit QA_RUN_ID so every process of a run writes into the same directory
+        self.run_id = run_id or os.environ.get("QA_RUN_ID") or datetime.now().strftime("%d_%m_%Y_%H_%M_%S")
+        self.base_dir = base_dir
+        self._dirs: Dict[Tuple[str, ...], Path] = {}
+
+    @classmethod
+    def current(cls) -> "RunContext":
+        if cls._current is None:
+            cls._current = cls()
+        return cls._current
+
+    @classmethod
+    def start(cls, run_id: Optional[str] = None) -> "RunContext":
+        cls._current = cls(run_id)
+        os.environ["QA_RUN_ID"] = cls._current.run_id
+        return cls._current
+
+    def directory(self, *parts: str) -> Path:
+        directory = self._dirs.get(parts)
+        if directory is None:
+            directory = self.base_dir.joinpath(*parts)
+            directory.mkdir(parents=True, exist_ok=True)
+            self._dirs[parts] = directory
+        return directory
+
+    def subscription_dir(self, subscription_name: str) -> Path:
+        return self.directory(subscription_name)
+
+    def execution_dir(self, subscription_name: str) -> Path:
+        return self.directory(subscription_name, self.run_id)
+
+    def env_dir(self, subscription_name: str, env_name: str) -> Path:
+        return self.directory(subscription_name, self.run_id, env_name)
+
+
+class JsonLinesWriter:
+    # The file is opened per flush, not held open, so a long-lived aggregator writing hundreds of
+    # site/env files never runs into the open file descriptor limit
+    def __init__(self, path: Path, flush_every: int = JSONL_FLUSH_EVERY):
+        self.path = path
+        self.flush_every = flush_every
+        self._pending = []
+
+    def write(self, record: dict):
+        self._pending.append(json.dumps(record, default=str))
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write("\n".join(self._pending) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            self._pending = []
+
+    def close(self):
+        self.flush()
+
+
+def iter_json_lines(file_path) -> Iterator[dict]:
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_json_lines(file_path) -> list:
+    return list(iter_json_lines(file_path))
+
+
+def umask_file_mode() -> int:
+    # Mode open() gives new files; temp files are created 0600 and os.replace keeps that mode
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# Read once at import; os.umask can only be read by setting it, which is not safe across threads
+NEW_FILE_MODE = umask_file_mode()
+
+
+def write_json_atomic(file_path: Path, data, indent: Optional[int] = 4):
+    # Readers see either the previous file or the complete new one, never a partial write
+    with tempfile.NamedTemporaryFile('w', dir=file_path.parent, prefix=f".{file_path.name}.", delete=False) as file:
+        json.dump(data, file, indent=indent, separators=None if indent else (",", ":"), default=str)
+        file.flush()
+        os.fsync(file.fileno())
+    os.chmod(file.name, NEW_FILE_MODE)
+    os.replace(file.name, file_path)
+
 
 class OutputHandler:
     results_cache = {}
     file_paths = {}  # Dictionary to store file paths of JSON files for each environment
+    writers = {}  # Open JSON Lines writers keyed by file path
+    comparison_buffers = {}  # Comparison records of the current run per subscription
+    pending_comparisons = {}  # Records buffered per subscription since the last flush
+    backends = None  # Result backends besides the JSON tree, built from RESULTS_BACKENDS on first use
+    site_urls = {}  # URL of every env per subscription, e.g. to tell the site's own links from third-party ones
 
     @staticmethod
     def ensure_directory_exists(directory: Path):
@@ -19,39 +132,61 @@ class OutputHandler:
 
     @staticmethod
     def get_subscription_dir(subscription_name: str) -> Path:
-        subscription_dir = RESULTS_BASE_DIR / subscription_name
-        return OutputHandler.ensure_directory_exists(subscription_dir)
+        return RunContext.current().subscription_dir(subscription_name)
 
     @staticmethod
     def get_execution_dir(subscription_name: str) -> Path:
-        current_time = datetime.now().strftime("%d_%m_%Y_%H_%M")
-        subscription_dir = OutputHandler.get_subscription_dir(subscription_name)
-        execution_dir = subscription_dir / current_time
-        return OutputHandler.ensure_directory_exists(execution_dir)
+        return RunContext.current().execution_dir(subscription_name)
 
     @staticmethod
     def get_env_dir(subscription_name: str, env_name: str) -> Path:
-        execution_dir = OutputHandler.get_execution_dir(subscription_name)
-        env_dir = execution_dir / env_name
-        return OutputHandler.ensure_directory_exists(env_dir)
+        return RunContext.current().env_dir(subscription_name, env_name)
 
     @staticmethod
-    def save_test_result(subscription_name: str, env_name: str, test_result: TestResult):
-        env_dir = OutputHandler.get_env_dir(subscription_name, env_name)
-        current_time = datetime.now().strftime("%d_%m_%Y_%H_%M")
-        json_file_name = f"{subscription_name}_{env_name}_{current_time}.json"
-        json_file_path = env_dir / json_file_name
+    def get_backends() -> list:
+        if OutputHandler.backends is None:
+            OutputHandler.backends = [SQLiteResultBackend()] if "sqlite" in RESULTS_BACKENDS else []
+        return OutputHandler.backends
+
+    @staticmethod
+    def register_site(site: Site):
+        OutputHandler.site_urls.setdefault(site.name, {})[site.env] = site.url
+
+    @staticmethod
+    def get_site_urls(subscription_name: str) -> Dict[str, str]:
+        return OutputHandler.site_urls.get(subscription_name, {})
 
+    @staticmethod
+    def save_test_result(subscription_name: str, env_name: str, test_result: TestResult):
         if subscription_name not in OutputHandler.results_cache:
             OutputHandler.results_cache[subscription_name] = {}
 
         if env_name not in OutputHandler.results_cache[subscription_name]:
             OutputHandler.results_cache[subscription_name][env_name] = []
 
-        OutputHandler.results_cache[subscription_name][env_name].append(test_result.model_dump())
+        record = test_result.model_dump()
+        OutputHandler.results_cache[subscription_name][env_name].append(record)
 
-        with open(json_file_path, 'w') as file:
-            json.dump(OutputHandler.results_cache[subscription_name][env_name], file, indent=4, default=str)
+        if "json" in RESULTS_BACKENDS:
+            OutputHandler.write_json_result(subscription_name, env_name, record)
+        for backend in OutputHandler.get_backends():
+            backend.save_test_result(RunContext.current().run_id, subscription_name, env_name, record)
+
+    @staticmethod
+    def write_json_result(subscription_name: str, env_name: str, record: dict):
+        env_dir = OutputHandler.get_env_dir(subscription_name, env_name)
+        run_id = RunContext.current().run_id
+        extension = "jsonl" if RESULTS_STORAGE_MODE == "jsonl" else "json"
+        json_file_name = f"{subscription_name}_{env_name}_{run_id}.{extension}"
+        json_file_path = env_dir / json_file_name
+
+        if RESULTS_STORAGE_MODE == "jsonl":
+            if json_file_path not in OutputHandler.writers:
+                OutputHandler.writers[json_file_path] = JsonLinesWriter(json_file_path)
+            OutputHandler.writers[json_file_path].write(record)
+        else:
+            with open(json_file_path, 'w') as file:
+                json.dump(OutputHandler.results_cache[subscription_name][env_name], file, indent=4, default=str)
 
         if subscription_name not in OutputHandler.file_paths:
             OutputHandler.file_paths[subscription_name] = {}
@@ -61,19 +196,25 @@ class OutputHandler:
 
     @staticmethod
     def save_comparison_result(subscription_name: str, comparison_result: ComparisonResult):
+        record = comparison_result.model_dump()
+        for backend in OutputHandler.get_backends():
+            backend.save_comparison_result(RunContext.current().run_id, subscription_name, record)
+
+        if "json" not in RESULTS_BACKENDS:
+            OutputHandler.comparison_buffers.setdefault(subscription_name, []).append(record)
+            return
+
         execution_dir = OutputHandler.get_execution_dir(subscription_name)
         comparison_file_path = execution_dir / "comparison.json"
 
-        if comparison_file_path.exists():
-            with open(comparison_file_path, 'r') as file:
-                existing_results = json.load(file)
-        else:
-            existing_results = []
-
-        existing_results.append(comparison_result.model_dump())
+        if subscription_name not in OutputHandler.comparison_buffers:
+            # Read at most once per run, to keep what an earlier process wrote under the same run ID
+            OutputHandler.comparison_buffers[subscription_name] = \
+                OutputHandler.read_results(comparison_file_path) if comparison_file_path.exists() else []
+            OutputHandler.pending_comparisons[subscription_name] = 0
 
-        with open(comparison_file_path, 'w') as file:
-            json.dump(existing_results, file, indent=4, default=str)
+        OutputHandler.comparison_buffers[subscription_name].append(record)
+        OutputHandler.pending_comparisons[subscription_name] += 1
 
         if subscription_name not in OutputHandler.file_paths:
             OutputHandler.file_paths[subscription_name] = {}
@@ -81,14 +222,66 @@ class OutputHandler:
         # Ensure only one path is stored for comparison
         OutputHandler.file_paths[subscription_name]["comparison"] = str(comparison_file_path)
 
+        if OutputHandler.pending_comparisons[subscription_name] >= COMPARISON_FLUSH_BATCH:
+            OutputHandler.flush_comparisons(subscription_name)
+
+    @staticmethod
+    def flush_comparisons(subscription_name: str):
+        if OutputHandler.pending_comparisons.get(subscription_name):
+            comparison_file_path = Path(OutputHandler.file_paths[subscription_name]["comparison"])
+            write_json_atomic(comparison_file_path, OutputHandler.comparison_buffers[subscription_name])
+            OutputHandler.pending_comparisons[subscription_name] = 0
+
     @staticmethod
     def get_test_results(subscription_name: str):
-        return OutputHandler.results_cache.get(subscription_name, {})
+        if subscription_name in OutputHandler.results_cache:
+            return OutputHandler.results_cache[subscription_name]
+        return {env: OutputHandler.read_results(path)
+                for env, path in OutputHandler.get_file_paths(subscription_name).items() if env != "comparison"}
 
     @staticmethod
     def get_file_paths(subscription_name: str):
+        OutputHandler.flush()
         return OutputHandler.file_paths.get(subscription_name, {})
 
+    @staticmethod
+    def get_report_data(subscription_name: str):
+        return OutputHandler.comparison_buffers.get(subscription_name, []), \
+            OutputHandler.get_test_results(subscription_name)
+
+    @staticmethod
+    def read_results(file_path) -> list:
+        if str(file_path).endswith(".jsonl"):
+            return read_json_lines(file_path)
+        with open(file_path, 'r') as file:
+            return json.load(file)
+
+    @staticmethod
+    def flush():
+        for writer in OutputHandler.writers.values():
+            writer.flush()
+        for subscription_name in OutputHandler.pending_comparisons:
+            OutputHandler.flush_comparisons(subscription_name)
+        for backend in OutputHandler.get_backends():
+            backend.flush()
+
+    @staticmethod
+    def export_json(jsonl_path: Path):
+        # End-of-run export of a JSON Lines file as the pretty JSON list the json mode writes
+        with open(jsonl_path.with_suffix(".json"), 'w') as file:
+            json.dump(read_json_lines(jsonl_path), file, indent=4, default=str)
+
+    @staticmethod
+    def close():
+        OutputHandler.flush()
+        for path, writer in OutputHandler.writers.items():
+            writer.close()
+            OutputHandler.export_json(path)
+        OutputHandler.writers.clear()
+        for backend in OutputHandler.get_backends():
+            backend.close()
+        OutputHandler.backends = None
+
 # import json
 # from datetime import datetime
 # from pathlib import Path
@@ -0,0 +1,139 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+from pydantic import TypeAdapter
+
+try:
+    import pyarrow
+except ImportError:  # pyarrow is optional; without it cached rows are pickled
+    pyarrow = None
+
+# Parsed input files, keyed by path, mtime, size and model (name, source, schema)
+INPUT_CACHE_DIR = Path(os.environ.get("INPUT_CACHE_DIR", ".input_cache"))
+INPUT_CACHE_ENABLED = os.environ.get("INPUT_CACHE_ENABLED", "true").lower() == "true"
+
+
+class ParsedInputCache:
+    _shared = None
+
+    def __init__(self, cache_dir: Path = INPUT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._adapters = {}
+
+    @classmethod
+    def shared(cls) -> "ParsedInputCache":
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @staticmethod
+    def path_hash(file_path) -> str:
+        return hashlib.sha256(os.path.abspath(file_path).encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def schema_hash(ModelClass=None) -> str:
+        if ModelClass is None:
+            return hashlib.sha256(json.dumps({}).encode("utf-8")).hexdigest()[:16]
+        # The schema misses validator changes, so the model's name and source (or __cache_version__) are keyed too
+        try:
+            source = inspect.getsource(ModelClass)
+        except (OSError, TypeError):
+            source = ""
+        key = {
+            "model": f"{ModelClass.__module__}.{ModelClass.__qualname__}",
+            "version": str(getattr(ModelClass, "__cache_version__", "")),
+            "source": hashlib.sha256(source.encode("utf-8")).hexdigest(),
+            "schema": ModelClass.model_json_schema(),
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def entry_prefix(self, file_path, ModelClass=None) -> str:
+        stat = os.stat(file_path)
+        return f"{self.path_hash(file_path)}_{self.schema_hash(ModelClass)}_{stat.st_mtime_ns}_{stat.st_size}"
+
+    def get_frame(self, file_path, ModelClass=None) -> Optional[pd.DataFrame]:
+        prefix = self.entry_prefix(file_path, ModelClass)
+        parquet_path, pickle_path = self.cache_dir / f"{prefix}.rows.parquet", self.cache_dir / f"{prefix}.rows.pkl"
+        try:
+            if pyarrow is not None and parquet_path.exists():
+                return pd.read_parquet(parquet_path)
+            if pickle_path.exists():
+                return pd.read_pickle(pickle_path)
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+            self.invalidate(file_path)
+        return None
+
+    def set_frame(self, file_path, df: pd.DataFrame, ModelClass=None):
+        prefix = self.entry_prefix(file_path, ModelClass)
+        self.drop_stale(file_path, ModelClass)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if pyarrow is not None:
+            try:
+                self._write_atomic(self.cache_dir / f"{prefix}.rows.parquet", lambda path: df.to_parquet(path))
+                return
+            except (ValueError, TypeError, pyarrow.ArrowException):
+                pass  # Mixed-type object columns have no parquet type; pickle keeps them as they are
+        self._write_atomic(self.cache_dir / f"{prefix}.rows.pkl", lambda path: df.to_pickle(path))
+
+    def get_models(self, file_path, ModelClass) -> Optional[Tuple[list, list]]:
+        prefix = self.entry_prefix(file_path, ModelClass)
+        errors_path = self.cache_dir / f"{prefix}.errors.pkl"
+        if not errors_path.exists():
+            return None
+        df = self.get_frame(file_path, ModelClass)
+        if df is None:
+            return None
+        with open(errors_path, "rb") as errors_file:
+            errors = pickle.load(errors_file)
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        return self.list_adapter(ModelClass).validate_python(records), errors
+
+    def set_models(self, file_path, ModelClass, models: list, errors: list):
+        self.set_frame(file_path, pd.DataFrame([model.model_dump() for model in models],
+                                               columns=list(ModelClass.__annotations__.keys())), ModelClass)
+        prefix = self.entry_prefix(file_path, ModelClass)
+        self._write_atomic(self.cache_dir / f"{prefix}.errors.pkl", lambda path: self._pickle(errors, path))
+
+    def invalidate(self, file_path=None):
+        # Drops every entry of one input file, or the whole cache when no path is given
+        if file_path is None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+        elif self.cache_dir.exists():
+            for entry in self.cache_dir.glob(f"{self.path_hash(file_path)}_*"):
+                entry.unlink(missing_ok=True)
+
+    def drop_stale(self, file_path, ModelClass=None):
+        # Entries of an older version of the file under the same schema are never read again
+        current = self.entry_prefix(file_path, ModelClass)
+        if self.cache_dir.exists():
+            for entry in self.cache_dir.glob(f"{self.path_hash(file_path)}_{self.schema_hash(ModelClass)}_*"):
+                if not entry.name.startswith(current + "."):
+                    entry.unlink(missing_ok=True)
+
+    def list_adapter(self, ModelClass) -> TypeAdapter:
+        if ModelClass not in self._adapters:
+            self._adapters[ModelClass] = TypeAdapter(List[ModelClass])
+        return self._adapters[ModelClass]
+
+    @staticmethod
+    def _pickle(value, path):
+        with open(path, "wb") as file:
+            pickle.dump(value, file)
+
+    def _write_atomic(self, path: Path, write):
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix=f".{path.name}.", delete=False) as file:
+            temp_path = file.name
+        try:
+            write(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
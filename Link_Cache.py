@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
+
+# Location and lifetime of the persisted link statuses
+LINK_CACHE_PATH = Path(os.environ.get("LINK_CACHE_PATH", "Result/link_cache.sqlite3"))
+LINK_CACHE_TTL = float(os.environ.get("LINK_CACHE_TTL", 6 * 60 * 60))
+# Seconds a writer waits for another process holding the database lock
+LINK_CACHE_DB_TIMEOUT = float(os.environ.get("LINK_CACHE_DB_TIMEOUT", 30))
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+class LinkStatusCache:
+    _shared = None
+
+    def __init__(self, path: Optional[Path] = LINK_CACHE_PATH, ttl: float = LINK_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[Union[int, str], float]] = {}
+        self._lock = threading.Lock()
+        self._connection = None
+        if path is not None:
+            try:
+                self._load()
+            except sqlite3.Error as e:
+                print(f"Link cache {self.path} unavailable, continuing in memory only: {e}")
+                self.close()
+
+    @classmethod
+    def shared(cls) -> "LinkStatusCache":
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def _load(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        # Orchestrator workers share the file; WAL lets them read while another one writes
+        self._connection = sqlite3.connect(str(self.path), timeout=LINK_CACHE_DB_TIMEOUT, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS link_status (url TEXT PRIMARY KEY, status TEXT, checked_at REAL)")
+        cutoff = time.time() - self.ttl
+        with self._connection:
+            self._connection.execute("DELETE FROM link_status WHERE checked_at < ?", (cutoff,))
+        for url, status, checked_at in self._connection.execute("SELECT url, status, checked_at FROM link_status"):
+            self._entries[url] = (int(status) if status.isdigit() else status, checked_at)
+
+    def get(self, url: str) -> Optional[Union[int, str]]:
+        key = normalize_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[1] < self.ttl:
+                self.hits += 1
+                return entry[0]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def set_many(self, statuses: Dict[str, Union[int, str]]):
+        now = time.time()
+        # Only real HTTP answers are cached; timeouts and connection errors are retried next time
+        rows = [(normalize_url(url), status, now) for url, status in statuses.items() if isinstance(status, int)]
+        with self._lock:
+            for key, status, checked_at in rows:
+                self._entries[key] = (status, checked_at)
+            if self._connection is not None and rows:
+                try:
+                    with self._connection:
+                        self._connection.executemany(
+                            "INSERT OR REPLACE INTO link_status (url, status, checked_at) VALUES (?, ?, ?)",
+                            [(key, str(status), checked_at) for key, status, checked_at in rows])
+                except sqlite3.Error as e:
+                    # The statuses stay cached in memory for this process; the check itself must not fail
+                    print(f"Link cache {self.path} not persisted: {e}")
+
+    def lookup(self, links: Iterable[str]) -> Tuple[Dict[str, Union[int, str]], list]:
+        cached, missing = {}, []
+        unique_links = {}
+        for link in links:
+            unique_links.setdefault(normalize_url(link), link)
+        for link in unique_links.values():
+            status = self.get(link)
+            if status is None:
+                missing.append(link)
+            else:
+                cached[link] = status
+        return cached, missing
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,62 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Concurrency and timeout for link checks, overridable per environment
+LINK_CHECK_CONCURRENCY = int(os.environ.get("LINK_CHECK_CONCURRENCY", 20))
+LINK_CHECK_TIMEOUT = float(os.environ.get("LINK_CHECK_TIMEOUT", 10))
+
+# Many servers answer HEAD with an error (400, 403, 404, 405, 999, ...) while GET works; any HEAD status
+# at or above this is retried with GET before a link is reported broken
+HEAD_FALLBACK_MIN_STATUS = 400
+
+
+class LinkChecker:
+    _session = None  # Keep-alive connection pool shared by every checker in the process
+
+    def __init__(self, max_workers: int = LINK_CHECK_CONCURRENCY, timeout: float = LINK_CHECK_TIMEOUT):
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    @classmethod
+    def session(cls) -> requests.Session:
+        if cls._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=LINK_CHECK_CONCURRENCY, pool_maxsize=LINK_CHECK_CONCURRENCY)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            cls._session = session
+        return cls._session
+
+    @classmethod
+    def close(cls):
+        if cls._session is not None:
+            cls._session.close()
+            cls._session = None
+
+    @staticmethod
+    def is_checkable(link: Optional[str]) -> bool:
+        return bool(link) and urlsplit(link).scheme in ("http", "https")
+
+    def check_link(self, link: str) -> Union[int, str]:
+        session = self.session()
+        try:
+            response = session.head(link, allow_redirects=True, timeout=self.timeout)
+            if response.status_code >= HEAD_FALLBACK_MIN_STATUS:
+                response = session.get(link, allow_redirects=True, timeout=self.timeout, stream=True)
+                response.close()
+            return response.status_code
+        except requests.RequestException as e:
+            return e.__class__.__name__
+
+    def check_links(self, links: Iterable[str]) -> Dict[str, Union[int, str]]:
+        unique_links = list(dict.fromkeys(link for link in links if self.is_checkable(link)))
+        if not unique_links:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique_links))) as executor:
+            statuses = executor.map(self.check_link, unique_links)
+            return dict(zip(unique_links, statuses))
@@ -0,0 +1,198 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from Utilities.Data_Structures import SiteEnv
+from Utilities.FilePath_Handler import RESULTS_BASE_DIR, RunContext, iter_json_lines
+from Utilities.Report_HTML import CSS_STYLES, STATUS_CLASSES, count_statuses
+
+# Index page of a run, linking to the <site>.html report of every site
+DASHBOARD_FILE = Path(os.environ.get("DASHBOARD_FILE", "index.html"))
+
+DASHBOARD_STYLES = '''
+    #results-table span.passed {
+      color: #4caf50;
+    }
+
+    #results-table span.failed {
+      color: #f44336;
+    }
+
+    #results-table span.existing {
+      color: #ff9800;
+    }
+
+    #results-table span.error {
+      color: #9e9e9e;
+    }
+'''
+
+DASHBOARD_TEMPLATE = '''
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="utf-8"/>
+        <title>QA Automation Dashboard</title>
+        <style>
+        {css_styles}
+        </style>
+        <script>
+            function filterResults(status) {{
+                var rows = document.getElementsByClassName('results-table');
+                for (var i = 0; i < rows.length; i++) {{
+                    if (status === 'all' || rows[i].classList.contains(status)) {{
+                        rows[i].style.display = '';
+                    }} else {{
+                        rows[i].style.display = 'none';
+                    }}
+                }}
+            }}
+
+            function toggleCard(cardClass) {{
+                var card = document.querySelector('.' + cardClass);
+                if (card.classList.contains('selected')) {{
+                    card.classList.remove('selected');
+                    filterResults('all');
+                }} else {{
+                    card.classList.add('selected');
+                    filterResults(cardClass);
+                }}
+            }}
+        </script>
+    </head>
+    <body>
+        <div class="container">
+            <h1>QA Automation Dashboard</h1>
+            <div id="environment">
+                <h2>Run</h2>
+                <table>
+                    <tr><td>Run ID</td><td>{run_id}</td></tr>
+                    <tr><td>Generated</td><td>{generated}</td></tr>
+                    <tr><td>Sites</td><td>{sites}</td></tr>
+                </table>
+            </div>
+            <div class="summary">
+                <h2>Summary</h2>
+                <div class="metric-card passed" onclick="toggleCard('passed')">
+                    <h3>Passed</h3>
+                    <p>{passed}</p>
+                </div>
+                <div class="metric-card failed" onclick="toggleCard('failed')">
+                    <h3>Failed</h3>
+                    <p>{failed}</p>
+                </div>
+                <div class="metric-card existing" onclick="toggleCard('existing')">
+                    <h3>Existing Issues</h3>
+                    <p>{existing}</p>
+                </div>
+                <div class="metric-card error" onclick="toggleCard('error')">
+                    <h3>Error</h3>
+                    <p>{error}</p>
+                </div>
+            </div>
+            <div class="results">
+                <h2>Sites</h2>
+                <table id="results-table">
+                    <thead id="results-table-head">
+                        {col_head}
+                    </thead>
+                    <tbody>
+                        {site_rows}
+                    </tbody>
+                </table>
+            </div>
+        </div>
+    </body>
+    </html>
+    '''
+
+
+def iter_results(file_path: Path) -> Iterator[dict]:
+    if file_path.suffix == ".jsonl":
+        yield from iter_json_lines(file_path)
+    else:
+        with open(file_path, 'r') as file:
+            yield from json.load(file)
+
+
+def env_result_file(env_dir: Path) -> Optional[Path]:
+    # The JSON Lines file is the source of truth; the .json export next to it is only written at close
+    for pattern in ("*.jsonl", "*.json"):
+        files = sorted(env_dir.glob(pattern))
+        if files:
+            return files[0]
+    return None
+
+
+def count_site_results(run_dir: Path) -> Tuple[dict, Dict[str, dict]]:
+    comparison_file = run_dir / "comparison.json"
+    overall = count_statuses(iter_results(comparison_file) if comparison_file.exists() else [])
+    env_counts = {}
+    for env_dir in sorted(path for path in run_dir.iterdir() if path.is_dir()):
+        result_file = env_result_file(env_dir)
+        if result_file is not None:
+            env_counts[env_dir.name] = count_statuses(iter_results(result_file))
+    return overall, env_counts
+
+
+def render_counts(counts: Optional[dict]) -> str:
+    if not counts:
+        return "<td></td>\n"
+    return "<td>" + " / ".join(
+        f'<span class="{status_class}">{counts[status_class]}</span>' for status_class in STATUS_CLASSES.values()
+    ) + "</td>\n"
+
+
+def render_site_row(site_name: str, overall: dict, env_counts: Dict[str, dict], environments) -> str:
+    # A site row carries the class of every status it has, so each summary card filters to the sites it counts
+    row_classes = " ".join(["results-table"] + [status_class for status_class, count in overall.items() if count])
+    parts = [f'<tr class="{row_classes}">\n',
+             f'<td><a href="{quote(site_name)}.html">{site_name}</a></td>\n',
+             render_counts(overall)]
+    parts.extend(render_counts(env_counts.get(env)) for env in environments)
+    parts.append("</tr>\n")
+    return "".join(parts)
+
+
+def generate_dashboard(run_id: Optional[str] = None, base_dir: Path = RESULTS_BASE_DIR,
+                       output_file: Path = DASHBOARD_FILE) -> Path:
+    run_id = run_id or RunContext.current().run_id
+    environments = [env.value for env in SiteEnv]
+    totals = dict.fromkeys(STATUS_CLASSES.values(), 0)
+    sites = 0
+
+    # Rows are spooled to disk as each site is counted, so only the run totals stay in memory
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as site_rows:
+        for site_dir in sorted(base_dir.iterdir()) if base_dir.exists() else []:
+            run_dir = site_dir / run_id
+            if not run_dir.is_dir():
+                continue
+            overall, env_counts = count_site_results(run_dir)
+            for status_class, count in overall.items():
+                totals[status_class] += count
+            site_rows.write(render_site_row(site_dir.name, overall, env_counts, environments))
+            sites += 1
+
+        col_head = "<th>Site</th>\n<th>Overall</th>\n" + "".join(
+            f"<th>{env.capitalize()}</th>\n" for env in environments)
+        template_head, template_tail = DASHBOARD_TEMPLATE.split("{site_rows}")
+        site_rows.seek(0)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(template_head.format(
+                css_styles=CSS_STYLES + DASHBOARD_STYLES,
+                run_id=run_id,
+                generated=datetime.datetime.now().strftime("%d-%m-%Y %H:%M:%S"),
+                sites=sites,
+                col_head=col_head,
+                **totals
+            ))
+            shutil.copyfileobj(site_rows, f)
+            f.write(template_tail.format())
+
+    print(f"Dashboard generated for {sites} sites: {output_file}")
+    return output_file
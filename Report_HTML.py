@@ -1,9 +1,56 @@
+import gzip
+import hashlib
+import io
 import json
 import datetime
+import os
 import platform
 import base64
+import shutil
+from pathlib import Path
+from urllib.parse import quote
 from selenium import webdriver
 
+from Utilities.Data_Structures import TestStatus
+from Utilities.FilePath_Handler import read_json_lines, write_json_atomic
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it the full image doubles as its own thumbnail
+    Image = None
+
+# Reuse rendered rows whose inputs did not change since the last render of the same report. Only rows with
+# screenshots or lazy-loaded details are cached: plain rows render faster than their cache key is computed.
+REPORT_INCREMENTAL = os.environ.get("REPORT_INCREMENTAL", "false").lower() == "true"
+
+# Move Actual_Result cells longer than the threshold into compressed shards loaded on row expansion
+REPORT_LAZY_DETAILS = os.environ.get("REPORT_LAZY_DETAILS", "false").lower() == "true"
+REPORT_LAZY_DETAILS_THRESHOLD = int(os.environ.get("REPORT_LAZY_DETAILS_THRESHOLD", 2048))
+
+# Screenshots are copied once per content hash into REPORT_ASSETS_DIR, next to the reports and shared by every run
+REPORT_ASSETS_DIR = Path(os.environ.get("REPORT_ASSETS_DIR", "report_assets"))
+REPORT_THUMBNAIL_SIZE = int(os.environ.get("REPORT_THUMBNAIL_SIZE", 200))
+
+# Stands in for the row id inside cached row fragments; it cannot occur in rendered HTML
+ROW_ID_PLACEHOLDER = "\x00row-id\x00"
+
+# Summary card each status is counted under
+STATUS_CLASSES = {
+    TestStatus.PASS.value: "passed",
+    TestStatus.FAIL.value: "failed",
+    TestStatus.EXISTING_SITE_ISSUE.value: "existing",
+    TestStatus.ERROR.value: "error"
+}
+
+
+def count_statuses(records, counts: dict = None) -> dict:
+    counts = counts if counts is not None else dict.fromkeys(STATUS_CLASSES.values(), 0)
+    for record in records:
+        status_class = STATUS_CLASSES.get(getattr(record["Status"], "value", record["Status"]))
+        if status_class:
+            counts[status_class] += 1
+    return counts
+
 
 # Dependency inversion principle: Abstract classes/interfaces
 class FileHandler:
@@ -15,6 +62,14 @@ class ImageHandler:
     def img_to_base64(self, img_path):
         raise NotImplementedError
 
+    def image_sources(self, img_path):
+        # (thumbnail src, full image src) of an image as referenced from the report
+        raise NotImplementedError
+
+    def image_key(self, img_path):
+        # Identifies the image in cached report rows
+        return img_path
+
 
 class ReportGenerator:
     def generate_result_table(self, comparison_file, env_files):
@@ -23,6 +78,8 @@ class ReportGenerator:
 
 class JsonFileHandler(FileHandler):
     def load_json_file(self, file_path):
+        if str(file_path).endswith(".jsonl"):
+            return read_json_lines(file_path)
         with open(file_path, "r") as json_file:
             return json.load(json_file)
 
@@ -32,95 +89,132 @@ class Base64ImageHandler(ImageHandler):
         with open(img_path, "rb") as img_file:
             return base64.b64encode(img_file.read()).decode('utf-8')
 
-
-class HTMLReportGenerator(ReportGenerator):
-    def __init__(self, file_handler: FileHandler, image_handler: ImageHandler):
-        self.file_handler = file_handler
-        self.image_handler = image_handler
-
-    def generate_result_table(self, comparison_file, env_files):
-        col_head = "<th>Result</th>\n<th>Check_name</th>\n"
-        data_main = ""
-        i = 1
-
-        # Load comparison data
-        comparison_data = self.file_handler.load_json_file(comparison_file)
-
-        # Extract environments from file_paths dict keys, excluding 'comparison'
-        environments = [env for env in env_files.keys() if env != 'comparison']
-
-        # Add environment columns dynamically based on environments list
-        for env in environments:
-            col_head += f"<th>{env.capitalize()}</th>\n"
-
-        for check_item in comparison_data:
-            check_name = check_item["Name"]
-            data_row1 = f'<tr class="results-table {check_item["Status"].lower()}" data-toggle="collapse" id="row{i}" data-target=".row{i}" onclick="toggleDetails(\'row{i}\')">\n'
-            data_main += data_row1
-            data_main += f"<td class='{check_item['Status'].lower()}'>{check_item['Status'].capitalize()}</td>\n"
-            data_main += f"<td>{check_name}</td>\n"
-
-            for env in environments:
-                env_file = env_files.get(env)
-                if env_file:
-                    env_details = next((env_item for env_item in env_file if env_item["Name"] == check_name), None)
-                    if env_details:
-                        data_main += f"<td>{env_details['Status']}</td>\n"
-                    else:
-                        data_main += "<td></td>\n"
-                else:
-                    data_main += "<td></td>\n"
-
-            data_row2 = f'</tr><tr class="collapse row{i}" style="display: none;">\n'
-            data_main += data_row2
-            data_main += f'<td>{check_item["Description"]}</td>\n'
-            data_main += f'<td>{check_item["Description"]}</td>\n'
-
-            for env in environments:
-                env_file = env_files.get(env)
-                if env_file:
-                    env_details = next((env_item for env_item in env_file if env_item["Name"] == check_name), None)
-                    if env_details:
-                        # if env_details["image"]:
-                        #     img_base64 = img_to_base64(env_details["image"])
-                        #     img_tag = f'<img src="data:image/png;base64,{img_base64}" alt="{env_details["Name"]}" width="200" onclick="enlargeImage(this.src)"/>'
-                        data_main += f'<td>{env_details["Actual_Result"]}</td>\n'
-                    else:
-                        data_main += "<td></td>\n"
-                else:
-                    data_main += "<td></td>\n"
-
-            data_row3 = '<td><input type="checkbox" /> Select</td></tr>\n'
-            data_main += data_row3
-            i += 1
-
-        return col_head, data_main
-
-
-def generate_html_report(file_paths, subscription):
-    file_handler = JsonFileHandler()
-    image_handler = Base64ImageHandler()
-    report_generator = HTMLReportGenerator(file_handler, image_handler)
-
-    comparison_file = file_paths['comparison']
-    env_files = {env: file_handler.load_json_file(path) for env, path in file_paths.items() if env != 'comparison'}
-
-    env_details = {
-        "Site": "Example Site",
-        "Subscription": "Paid",
-        "Execution Date and Time": datetime.datetime.now().strftime("%d-%m-%Y %H:%M:%S"),
-        "Prod_Url": "http://example.com/prod",
-        "Stage_Url": "http://example.com/stage",
-        "Dev_Url": "http://example.com/dev",
-        "Platform": platform.system(),
-        "Total_Execution_Time": "00:10:00",
-        "Browser": "Chrome",
-        "Browser_ver.": "91.0"
-    }
-
-    col_head, data_main = report_generator.generate_result_table(comparison_file, env_files)
-
-    css_styles = '''
+    def image_sources(self, img_path):
+        src = f"data:image/png;base64,{self.img_to_base64(img_path)}"
+        return src, src
+
+
+class AssetImageHandler(Base64ImageHandler):
+    def __init__(self, asset_dir: Path, report_dir: Path = Path("."), thumbnail_size: int = REPORT_THUMBNAIL_SIZE,
+                 known_hashes: dict = None):
+        self.asset_dir = asset_dir
+        self.report_dir = report_dir
+        self.thumbnail_size = thumbnail_size
+        self.asset_dir.mkdir(parents=True, exist_ok=True)
+        self._sources = {}
+        self._known_hashes = known_hashes or {}  # path -> [size, mtime_ns, hash] from an earlier render
+        self.hashes = {}  # Same, for the images of this render
+
+    @staticmethod
+    def content_hash(img_path) -> str:
+        digest = hashlib.sha256()
+        with open(img_path, "rb") as img_file:
+            for chunk in iter(lambda: img_file.read(1 << 16), b""):
+                digest.update(chunk)
+        return digest.hexdigest()[:32]
+
+    def image_key(self, img_path):
+        # Screenshot paths contain the run ID; the content hash is what a cached row depends on.
+        # A file whose size and mtime match an earlier render is not read again.
+        if img_path not in self.hashes:
+            stat = os.stat(img_path)
+            signature = [stat.st_size, stat.st_mtime_ns]
+            known = self._known_hashes.get(img_path)
+            self.hashes[img_path] = known if known and known[:2] == signature else \
+                signature + [self.content_hash(img_path)]
+        return self.hashes[img_path][2]
+
+    def image_sources(self, img_path):
+        if img_path not in self._sources:
+            content_hash = self.image_key(img_path)
+            full_path = self.asset_dir / f"{content_hash}{Path(img_path).suffix.lower() or '.png'}"
+            if not full_path.exists():
+                shutil.copyfile(img_path, full_path)
+            thumbnail_path = self.make_thumbnail(full_path, self.asset_dir / f"{content_hash}_thumb.png")
+            self._sources[img_path] = (self.relative_src(thumbnail_path), self.relative_src(full_path))
+        return self._sources[img_path]
+
+    def make_thumbnail(self, full_path: Path, thumbnail_path: Path) -> Path:
+        if Image is None:
+            return full_path
+        if not thumbnail_path.exists():
+            try:
+                with Image.open(full_path) as image:
+                    image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+                    image.save(thumbnail_path, "PNG")
+            except OSError:
+                return full_path
+        return thumbnail_path
+
+    def relative_src(self, path: Path) -> str:
+        return quote(Path(os.path.relpath(path, self.report_dir)).as_posix())
+
+
+class DetailShardWriter:
+    def __init__(self, shard_dir: Path, threshold: int = REPORT_LAZY_DETAILS_THRESHOLD):
+        self.shard_dir = shard_dir
+        self.threshold = threshold
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+
+    def is_heavy(self, detail: str) -> bool:
+        return len(detail) > self.threshold
+
+    def write(self, details: dict) -> str:
+        # Shards are JS files so they also load from file:// where fetch() is blocked. They carry no row
+        # id; the loading <script> tells them which row they belong to, so moved rows reuse their shard.
+        payload = base64.b64encode(gzip.compress(json.dumps(details).encode("utf-8"))).decode("ascii")
+        content = f'qaDetailShardLoaded(document.currentScript.getAttribute("data-row"), "{payload}");\n'
+        shard_name = hashlib.sha256(content.encode("utf-8")).hexdigest()[:32] + ".js"
+        shard_path = self.shard_dir / shard_name
+        if not shard_path.exists():
+            shard_path.write_text(content, encoding="utf-8")
+        return f"{quote(self.shard_dir.name)}/{shard_name}"
+
+
+class RowFragmentCache:
+    def __init__(self, manifest_path: Path):
+        self.manifest_path = manifest_path
+        self.previous_rows = {}
+        self.previous_image_hashes = {}
+        self.rows = {}
+        self.reused = 0
+        self.rendered = 0
+        if manifest_path.exists():
+            try:
+                with open(manifest_path, "r") as manifest_file:
+                    manifest = json.load(manifest_file)
+                self.previous_rows = manifest.get("rows", {})
+                self.previous_image_hashes = manifest.get("image_hashes", {})
+            except (OSError, ValueError):
+                self.previous_rows, self.previous_image_hashes = {}, {}
+
+    @staticmethod
+    def row_key(*row_inputs) -> str:
+        return hashlib.sha256(json.dumps(row_inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def get_or_render(self, row_inputs, render):
+        key = self.row_key(*row_inputs)
+        fragment = self.previous_rows.get(key)
+        if fragment is None:
+            fragment = render()
+            self.rendered += 1
+        else:
+            self.reused += 1
+        self.rows[key] = fragment
+        return fragment
+
+    def save(self, image_hashes: dict = None):
+        # Only the rows and images of this render are kept, written compact, so the manifest stays small
+        write_json_atomic(self.manifest_path, {
+            "total_rows": self.reused + self.rendered,
+            "reused_rows": self.reused,
+            "rendered_rows": self.rendered,
+            "rows": self.rows,
+            "image_hashes": image_hashes or {}
+        }, indent=None)
+
+
+CSS_STYLES = '''
     body {
       font-family: Helvetica, Arial, sans-serif;
       font-size: 12px;
@@ -274,7 +368,7 @@ def generate_html_report(file_paths, subscription):
     }
     '''
 
-    html_template = '''
+HTML_TEMPLATE = '''
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -289,6 +383,7 @@ def generate_html_report(file_paths, subscription):
                 var elements = document.getElementsByClassName(id);
                 for (var i = 0; i < elements.length; i++) {{
                     if (elements[i].style.display === 'none' || elements[i].style.display === '') {{
+                        loadDetailShard(elements[i], id);
                         elements[i].style.display = 'table-row';
                     }} else {{
                         elements[i].style.display = 'none';
@@ -296,6 +391,30 @@ def generate_html_report(file_paths, subscription):
                 }}
             }}
 
+            function loadDetailShard(row, id) {{
+                var src = row.getAttribute('data-shard');
+                if (!src || row.getAttribute('data-shard-loaded')) {{
+                    return;
+                }}
+                row.setAttribute('data-shard-loaded', 'true');
+                var script = document.createElement('script');
+                script.src = src;
+                script.setAttribute('data-row', id);
+                document.head.appendChild(script);
+            }}
+
+            function qaDetailShardLoaded(id, payload) {{
+                var bytes = Uint8Array.from(atob(payload), function (c) {{ return c.charCodeAt(0); }});
+                var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+                new Response(stream).text().then(function (text) {{
+                    var details = JSON.parse(text);
+                    var cells = document.querySelectorAll('tr.' + id + ' [data-detail]');
+                    for (var i = 0; i < cells.length; i++) {{
+                        cells[i].textContent = details[cells[i].getAttribute('data-detail')];
+                    }}
+                }});
+            }}
+
             function filterResults(status) {{
                 var rows = document.getElementsByClassName('results-table');
                 for (var i = 0; i < rows.length; i++) {{
@@ -397,8 +516,158 @@ def generate_html_report(file_paths, subscription):
     </html>
     '''
 
-    html_content = html_template.format(
-        css_styles=css_styles,
+
+class HTMLReportGenerator(ReportGenerator):
+    def __init__(self, file_handler: FileHandler, image_handler: ImageHandler,
+                 detail_shards: DetailShardWriter = None):
+        self.file_handler = file_handler
+        self.image_handler = image_handler
+        self.detail_shards = detail_shards
+
+    def generate_result_table(self, comparison_file, env_files):
+        # Load comparison data
+        comparison_data = self.file_handler.load_json_file(comparison_file)
+        return self.build_result_table(comparison_data, env_files)
+
+    def build_result_table(self, comparison_data, env_files):
+        data_main = io.StringIO()
+        self.write_result_table(data_main, comparison_data, env_files)
+        return self.build_column_head(env_files), data_main.getvalue()
+
+    @staticmethod
+    def get_environments(env_files):
+        # Extract environments from file_paths dict keys, excluding 'comparison'
+        return [env for env in env_files.keys() if env != 'comparison']
+
+    def build_column_head(self, env_files):
+        # Add environment columns dynamically based on environments list
+        return "<th>Result</th>\n<th>Check_name</th>\n" + "".join(
+            f"<th>{env.capitalize()}</th>\n" for env in self.get_environments(env_files))
+
+    @staticmethod
+    def index_env_results(env_files, environments):
+        # Check name -> first result with that name, per environment
+        env_index = {}
+        for env in environments:
+            env_index[env] = {}
+            for env_item in env_files.get(env) or []:
+                env_index[env].setdefault(env_item["Name"], env_item)
+        return env_index
+
+    def write_result_table(self, out, comparison_data, env_files, fragment_cache: RowFragmentCache = None):
+        environments = self.get_environments(env_files)
+        env_index = self.index_env_results(env_files, environments)
+
+        for i, check_item in enumerate(comparison_data, start=1):
+            env_details_list = [env_index[env].get(check_item["Name"]) for env in environments]
+            if fragment_cache is None or not self.is_costly_row(env_details_list):
+                out.write(self.render_row(f"row{i}", check_item, env_details_list))
+            else:
+                # Cached fragments are position-free: the row id is filled in when the page is assembled
+                fragment = fragment_cache.get_or_render(
+                    (check_item, [self.rendered_fields(env_details) for env_details in env_details_list],
+                     self.detail_shards is not None, str(getattr(self.image_handler, "asset_dir", ""))),
+                    lambda: self.render_row(ROW_ID_PLACEHOLDER, check_item, env_details_list))
+                out.write(fragment.replace(ROW_ID_PLACEHOLDER, f"row{i}"))
+
+    def is_costly_row(self, env_details_list):
+        # Screenshots (thumbnails, asset copies) and detail shards (gzip) cost more to render than to key
+        return self.detail_shards is not None or any(
+            env_details and env_details.get("Image") for env_details in env_details_list)
+
+    def rendered_fields(self, env_details):
+        # Only what render_row shows; the env Description (e.g. link cache hit counts) changes every run
+        if not env_details:
+            return None
+        fields = {field: env_details.get(field) for field in ("Name", "Status", "Actual_Result")}
+        image = env_details.get("Image")
+        fields["Image"] = self.image_handler.image_key(image) if image and os.path.exists(image) else None
+        return fields
+
+    def render_row(self, row_id, check_item, env_details_list):
+        status = check_item["Status"]
+        parts = [
+            f'<tr class="results-table {status.lower()}" data-toggle="collapse" id="{row_id}" data-target=".{row_id}" onclick="toggleDetails(\'{row_id}\')">\n',
+            f"<td class='{status.lower()}'>{status.capitalize()}</td>\n",
+            f"<td>{check_item['Name']}</td>\n"
+        ]
+        for env_details in env_details_list:
+            parts.append(f"<td>{env_details['Status']}</td>\n" if env_details else "<td></td>\n")
+
+        detail_cells, heavy_details = self.render_detail_cells(env_details_list)
+        shard_attribute = f' data-shard="{self.detail_shards.write(heavy_details)}"' if heavy_details else ""
+        parts.append(f'</tr><tr class="collapse {row_id}" style="display: none;"{shard_attribute}>\n')
+        parts.append(f'<td>{check_item["Description"]}</td>\n')
+        parts.append(f'<td>{check_item["Description"]}</td>\n')
+        parts.extend(detail_cells)
+
+        parts.append('<td><input type="checkbox" /> Select</td></tr>\n')
+        return "".join(parts)
+
+    def render_detail_cells(self, env_details_list):
+        detail_cells, heavy_details = [], {}
+        for index, env_details in enumerate(env_details_list):
+            if not env_details:
+                detail_cells.append("<td></td>\n")
+                continue
+            img_tag = self.render_image(env_details)
+            detail = f'{env_details["Actual_Result"]}'
+            if self.detail_shards is not None and self.detail_shards.is_heavy(detail):
+                heavy_details[str(index)] = detail
+                detail_cells.append(f'<td>{img_tag}<span data-detail="{index}">Loading...</span></td>\n')
+            else:
+                detail_cells.append(f'<td>{img_tag}{detail}</td>\n')
+        return detail_cells, heavy_details
+
+    def render_image(self, env_details):
+        if not env_details.get("Image") or not os.path.exists(env_details["Image"]):
+            return ""
+        # Only the thumbnail is in the page; the full image is fetched when it is enlarged
+        thumbnail_src, full_src = self.image_handler.image_sources(env_details["Image"])
+        return (f'<div class="media-container"><img class="enlarge-image" src="{thumbnail_src}" '
+                f'data-full="{full_src}" alt="{env_details["Name"]}" loading="lazy" '
+                f'onclick="event.stopPropagation(); enlargeImage(this.getAttribute(\'data-full\'))"/></div>')
+
+
+def generate_html_report(file_paths, subscription):
+    file_handler = JsonFileHandler()
+    comparison_data = file_handler.load_json_file(file_paths['comparison'])
+    env_files = {env: file_handler.load_json_file(path) for env, path in file_paths.items() if env != 'comparison'}
+    render_html_report(comparison_data, env_files, subscription)
+
+
+def generate_html_report_from_store(result_store, subscription, run_id=None):
+    run_id = run_id or result_store.latest_run(subscription)
+    comparison_data, env_files = result_store.get_report_data(run_id, subscription)
+    render_html_report(comparison_data, env_files, subscription)
+
+
+def render_html_report(comparison_data, env_files, subscription, incremental=REPORT_INCREMENTAL,
+                       lazy_details=REPORT_LAZY_DETAILS):
+    file_handler = JsonFileHandler()
+    fragment_cache = RowFragmentCache(Path(f'{subscription}.html.manifest.json')) if incremental else None
+    image_handler = AssetImageHandler(
+        REPORT_ASSETS_DIR, known_hashes=fragment_cache.previous_image_hashes if fragment_cache else None)
+    detail_shards = DetailShardWriter(Path(f'{subscription}_details')) if lazy_details else None
+    report_generator = HTMLReportGenerator(file_handler, image_handler, detail_shards)
+
+    env_details = {
+        "Site": "Example Site",
+        "Subscription": "Paid",
+        "Execution Date and Time": datetime.datetime.now().strftime("%d-%m-%Y %H:%M:%S"),
+        "Prod_Url": "http://example.com/prod",
+        "Stage_Url": "http://example.com/stage",
+        "Dev_Url": "http://example.com/dev",
+        "Platform": platform.system(),
+        "Total_Execution_Time": "00:10:00",
+        "Browser": "Chrome",
+        "Browser_ver.": "91.0"
+    }
+
+    status_counts = count_statuses(comparison_data)
+    template_head, template_tail = HTML_TEMPLATE.split("{result_rows}")
+    page_head = template_head.format(
+        css_styles=CSS_STYLES,
         Site=env_details["Site"],
         Subscription=env_details["Subscription"],
         Execution_Date_and_Time=env_details["Execution Date and Time"],
@@ -409,17 +678,21 @@ def generate_html_report(file_paths, subscription):
         Total_Execution_Time=env_details["Total_Execution_Time"],
         Browser=env_details["Browser"],
         Browser_ver=env_details["Browser_ver."],
-        passed="1",
-        failed="2",
-        xfailed="3",
-        skipped="4",
-        col_head=col_head,
-        result_rows=data_main
+        passed=status_counts["passed"],
+        failed=status_counts["failed"],
+        xfailed=status_counts["existing"],
+        skipped=status_counts["error"],
+        col_head=report_generator.build_column_head(env_files)
     )
 
-    # Write the HTML content to a file
+    # Stream the HTML straight to the file: page head, one row at a time, then the closing markup
     with open(f'{subscription}.html', 'w') as f:
-        f.write(html_content)
+        f.write(page_head)
+        report_generator.write_result_table(f, comparison_data, env_files, fragment_cache)
+        f.write(template_tail.format())
+
+    if fragment_cache is not None:
+        fragment_cache.save(image_handler.hashes)
 
     print("Report generated successfully!")
 
@@ -0,0 +1,56 @@
+import importlib
+import traceback
+from typing import Dict, Set, Tuple
+
+from Utilities.Data_Structures import Site, TestResult
+from Utilities.FilePath_Handler import OutputHandler
+
+STOP = "stop"
+
+
+class AggregatorClient:
+    def __init__(self, results_queue):
+        self.results_queue = results_queue
+
+    def submit(self, execution, test_result: TestResult):
+        check_class = type(execution)
+        self.results_queue.put((
+            "result", check_class.__module__, check_class.__qualname__,
+            execution.site.model_dump(), execution.site_data[2], test_result.model_dump()))
+
+
+class ResultAggregator:
+    def __init__(self):
+        self.arrived: Dict[Tuple[str, str, str], Set[str]] = {}
+
+    def handle_result(self, module_name: str, class_name: str, site_dict: dict, env_count: int, record: dict):
+        site = Site(**site_dict)
+        OutputHandler.register_site(site)
+        OutputHandler.save_test_result(site.name, site.env, TestResult(**record))
+
+        key = (site.name, module_name, class_name)
+        envs = self.arrived.setdefault(key, set())
+        envs.add(site.env)
+        if len(envs) == env_count:
+            # Every env of this site has reported this check: compare and rebuild the site's report
+            del self.arrived[key]
+            check_class = getattr(importlib.import_module(module_name), class_name)
+            check_class.from_site_data((site, env_count, env_count)).finish_site()
+
+    def serve(self, results_queue) -> dict:
+        while True:
+            message = results_queue.get()
+            if message == STOP:
+                break
+            try:
+                self.handle_result(*message[1:])
+            except Exception:
+                traceback.print_exc()
+        for site_name, module_name, class_name in self.arrived:
+            print(f"Incomplete results for {site_name} ({class_name}): no comparison was run")
+        OutputHandler.close()
+        return OutputHandler.file_paths
+
+
+def serve(results_queue, file_paths_queue):
+    file_paths_queue.put(ResultAggregator().serve(results_queue))
@@ -0,0 +1,169 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Location of the indexed results database shared by every run
+RESULTS_DB_PATH = Path(os.environ.get("RESULTS_DB_PATH", "Result/results.sqlite3"))
+RESULTS_DB_BATCH = int(os.environ.get("RESULTS_DB_BATCH", 100))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS test_results (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    site TEXT NOT NULL,
+    env TEXT NOT NULL,
+    check_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    description TEXT,
+    actual_result TEXT,
+    image TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS comparison_results (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    site TEXT NOT NULL,
+    check_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    description TEXT,
+    expected_result TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_test_results_site ON test_results (site);
+CREATE INDEX IF NOT EXISTS idx_test_results_env ON test_results (env);
+CREATE INDEX IF NOT EXISTS idx_test_results_check ON test_results (check_name);
+CREATE INDEX IF NOT EXISTS idx_test_results_status ON test_results (status);
+CREATE INDEX IF NOT EXISTS idx_test_results_run ON test_results (run_id);
+CREATE INDEX IF NOT EXISTS idx_test_results_history ON test_results (site, env, check_name, created_at);
+CREATE INDEX IF NOT EXISTS idx_comparison_results_site_run ON comparison_results (site, run_id);
+CREATE INDEX IF NOT EXISTS idx_comparison_results_check ON comparison_results (check_name);
+CREATE INDEX IF NOT EXISTS idx_comparison_results_status ON comparison_results (status);
+"""
+
+# Columns added after the first release of the schema; databases created before them are migrated on open
+ADDED_COLUMNS = {
+    "test_results": [("image", "TEXT")],
+}
+
+
+def _status_value(status) -> str:
+    return getattr(status, "value", status)
+
+
+class ResultBackend:
+    def save_test_result(self, run_id: str, subscription_name: str, env_name: str, record: dict):
+        raise NotImplementedError
+
+    def save_comparison_result(self, run_id: str, subscription_name: str, record: dict):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteResultBackend(ResultBackend):
+    def __init__(self, path: Path = RESULTS_DB_PATH, batch_size: int = RESULTS_DB_BATCH):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._add_missing_columns()
+        self._lock = threading.Lock()
+        self._pending_results = []
+        self._pending_comparisons = []
+
+    def save_test_result(self, run_id: str, subscription_name: str, env_name: str, record: dict):
+        with self._lock:
+            self._pending_results.append((
+                run_id, subscription_name, env_name, record["Name"], _status_value(record["Status"]),
+                record.get("Description"), json.dumps(record.get("Actual_Result"), default=str), record.get("Image"),
+                time.time()))
+        if len(self._pending_results) >= self.batch_size:
+            self.flush()
+
+    def save_comparison_result(self, run_id: str, subscription_name: str, record: dict):
+        with self._lock:
+            self._pending_comparisons.append((
+                run_id, subscription_name, record["Name"], _status_value(record["Status"]),
+                record.get("Description"), json.dumps(record.get("Expected_Result"), default=str), time.time()))
+        if len(self._pending_comparisons) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with self._lock, self._connection:
+            if self._pending_results:
+                self._connection.executemany(
+                    "INSERT INTO test_results (run_id, site, env, check_name, status, description, actual_result, "
+                    "image, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._pending_results)
+                self._pending_results = []
+            if self._pending_comparisons:
+                self._connection.executemany(
+                    "INSERT INTO comparison_results (run_id, site, check_name, status, description, expected_result, "
+                    "created_at) VALUES (?, ?, ?, ?, ?, ?, ?)", self._pending_comparisons)
+                self._pending_comparisons = []
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    def _add_missing_columns(self):
+        with self._connection:
+            for table, columns in ADDED_COLUMNS.items():
+                existing = {row[1] for row in self._connection.execute(f"PRAGMA table_info({table})")}
+                for column, column_type in columns:
+                    if column not in existing:
+                        self._connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        self.flush()
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def runs(self, subscription_name: str) -> List[str]:
+        rows = self._query("SELECT run_id, MIN(created_at) AS started FROM test_results WHERE site = ? "
+                           "GROUP BY run_id ORDER BY started", (subscription_name,))
+        return [run_id for run_id, _ in rows]
+
+    def latest_run(self, subscription_name: str) -> Optional[str]:
+        runs = self.runs(subscription_name)
+        return runs[-1] if runs else None
+
+    def get_test_results(self, run_id: str, subscription_name: str) -> Dict[str, List[dict]]:
+        env_results = {}
+        for env, name, status, description, actual_result, image in self._query(
+                "SELECT env, check_name, status, description, actual_result, image FROM test_results "
+                "WHERE run_id = ? AND site = ? ORDER BY id", (run_id, subscription_name)):
+            env_results.setdefault(env, []).append({
+                "Name": name, "Status": status, "Description": description,
+                "Actual_Result": json.loads(actual_result), "Image": image})
+        return env_results
+
+    def get_comparison_results(self, run_id: str, subscription_name: str) -> List[dict]:
+        return [{"Name": name, "Status": status, "Description": description,
+                 "Expected_Result": json.loads(expected_result)}
+                for name, status, description, expected_result in self._query(
+                    "SELECT check_name, status, description, expected_result FROM comparison_results "
+                    "WHERE run_id = ? AND site = ? ORDER BY id", (run_id, subscription_name))]
+
+    def get_report_data(self, run_id: str, subscription_name: str) -> Tuple[List[dict], Dict[str, List[dict]]]:
+        return self.get_comparison_results(run_id, subscription_name), self.get_test_results(run_id, subscription_name)
+
+    def status_history(self, subscription_name: str, env_name: str, check_name: str) -> List[Tuple[str, str]]:
+        return self._query("SELECT run_id, status FROM test_results WHERE site = ? AND env = ? AND check_name = ? "
+                           "ORDER BY created_at", (subscription_name, env_name, check_name))
+
+    def failing_since(self, subscription_name: str, env_name: str, check_name: str,
+                      passed_status: str = "Passed") -> Optional[str]:
+        # Run ID where the current unbroken streak of non-passing results started
+        since = None
+        for run_id, status in self.status_history(subscription_name, env_name, check_name):
+            since = None if status == passed_status else (since or run_id)
+        return since
@@ -2,11 +2,11 @@ import json
 from pathlib import Path
 
 import pytest
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 
 from Contracts.Contract_TestCases import TestExecution
+from Utilities.Browser_Pool import BrowserPool
 from Utilities.Data_Structures import Site
+from Utilities.FilePath_Handler import OutputHandler
 
 
 def pytest_ignore_collect(collection_path: Path, config):
@@ -32,14 +32,13 @@ def pytest_generate_tests(metafunc):
         metafunc.parametrize('site', sites_with_index, scope='module')
 
 
+def pytest_sessionfinish(session, exitstatus):
+    OutputHandler.close()
+
+
 @pytest.fixture(scope="module")
 def setup():
-    options = Options()
-    options.page_load_strategy = 'normal'
-    options.set_capability('goog:perfLoggingPrefs ', {"enableNetwork": True, "enablePage": True})
-    options.set_capability('goog:loggingPrefs ', {'performance': 'ALL', 'browser': 'ALL'})
-    # options.add_argument('--headless=new')
-    driver = webdriver.Chrome(options=options)
-    driver.maximize_window()
+    pool = BrowserPool.shared()
+    driver = pool.acquire()
     yield driver
-    driver.quit()
+    pool.release(driver)
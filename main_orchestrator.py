@@ -0,0 +1,87 @@
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import sys
+from functools import partial
+from typing import List, Sequence, Tuple
+
+import pytest
+
+from Contracts.Contract_TestCases import TestExecution
+from TestCases.Base_Test import ExtractSite
+from TestCases.test_page_not_found import PageNotFound
+from Utilities.Browser_Pool import BrowserPool
+from Utilities.FilePath_Handler import RunContext
+from Utilities.Report_Dashboard import generate_dashboard
+from Utilities.Result_Aggregator import AggregatorClient, STOP, serve
+
+# Worker processes used for site sublists; each worker keeps its own warm driver
+ORCHESTRATOR_WORKERS = int(os.environ.get("ORCHESTRATOR_WORKERS", os.cpu_count() or 1))
+
+
+def init_worker(results_queue):
+    # Workers only run checks; the aggregator process owns the result files, comparisons and reports
+    TestExecution.aggregator = AggregatorClient(results_queue)
+    # Pool workers leave through multiprocessing's exit path, which skips atexit but runs finalizers
+    multiprocessing.util.Finalize(None, BrowserPool.shutdown_shared, exitpriority=10)
+
+
+def run_sublist(job: Tuple[str, list], pytest_args: Sequence[str] = ()) -> Tuple[str, int]:
+    sublist_json, probe_results = job
+    site_name = json.loads(sublist_json)[0]['name']
+    PageNotFound.probe_results.update({(site_name, env): outcome for env, outcome in probe_results})
+    exit_code = pytest.main(list(pytest_args) + ['-s', '--sublist', sublist_json])
+    return site_name, int(exit_code)
+
+
+def print_summary(results: List[Tuple[str, int, dict]]):
+    print("\n========== Site execution summary ==========")
+    for site_name, exit_code, file_paths in sorted(results):
+        status = "OK" if exit_code == pytest.ExitCode.OK else f"FAILED (exit {exit_code})"
+        print(f"{site_name}: {status}")
+        for key, path in file_paths.items():
+            print(f"    {key}: {path}")
+    failed = sum(1 for _, exit_code, _ in results if exit_code != pytest.ExitCode.OK)
+    print(f"Sites: {len(results)}, passed: {len(results) - failed}, failed: {failed}")
+
+
+def run_sites(data_file_path: str, workers: int = ORCHESTRATOR_WORKERS, pytest_args: Sequence[str] = ()) -> int:
+    nested_list = ExtractSite().read_and_map_sites(data_file_path)
+    if not nested_list:
+        print(f"No sites found in {data_file_path}")
+        return 0
+
+    # Fixes the run ID before the workers are spawned; they pick it up from QA_RUN_ID
+    RunContext.start()
+
+    # Pre-flight: every 404 probe runs here concurrently, before any browser starts
+    probe_results = PageNotFound.probe_all(nested_list)
+    jobs = [(json.dumps([site.dict() for site in sublist]),
+             [(site.env, probe_results[(site.name, site.env)]) for site in sublist])
+            for sublist in nested_list]
+
+    context = multiprocessing.get_context("spawn")
+    results_queue, file_paths_queue = context.Queue(), context.Queue()
+    aggregator = context.Process(target=serve, args=(results_queue, file_paths_queue))
+    aggregator.start()
+
+    # Close and join instead of terminate so every worker quits its browser on the way out
+    pool = context.Pool(processes=min(workers, len(jobs)), initializer=init_worker, initargs=(results_queue,))
+    try:
+        exit_codes = list(pool.imap_unordered(partial(run_sublist, pytest_args=pytest_args), jobs))
+    finally:
+        pool.close()
+        pool.join()
+        results_queue.put(STOP)
+    file_paths = file_paths_queue.get()
+    aggregator.join()
+
+    results = [(site_name, exit_code, file_paths.get(site_name, {})) for site_name, exit_code in exit_codes]
+    print_summary(results)
+    generate_dashboard()
+    return max(exit_code for _, exit_code, _ in results)
+
+
+if __name__ == "__main__":
+    sys.exit(run_sites(sys.argv[1] if len(sys.argv) > 1 else "InputFiles\\data.xlsx"))
@@ -6,7 +6,10 @@ from Contracts.Contract_TestCases import TestExecution
 from TestCases.Base_Test import ExtractSite
 from TestCases.test_console_errors import Errors
 from TestCases.test_page_not_found import PageNotFound
+from TestCases.test_visual_diff import VisualDiff
+from Utilities.Browser_Pool import BrowserPool
 from Utilities.FilePath_Handler import OutputHandler
+from Utilities.Report_Dashboard import generate_dashboard
 
 
 # @pytest.fixture(scope="session", autouse=True)
@@ -33,14 +36,24 @@ def test_page_not_found(site, setup):
     PageNotFound(site, driver)
 
 
+# Define the test function
+def test_visual_diff(site, setup):
+    driver = setup
+    print(f"Running Visual Diff Test for: {site}")
+    VisualDiff(site, driver)
+
+
 def teardown_module():
     print(f"----------------------->>>>> : ")
 
 
 if __name__ == "__main__":
     nested_list = ExtractSite().read_and_map_sites("InputFiles\\data.xlsx")
+    PageNotFound.probe_all(nested_list)
     for sublist in nested_list:
         sublist_json = json.dumps([site.dict() for site in sublist])
         pytest_args = ['-s', '--sublist', sublist_json]
         print(pytest_args)
         pytest.main(pytest_args)
+    BrowserPool.shutdown_shared()
+    generate_dashboard()
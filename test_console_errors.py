@@ -1,13 +1,12 @@
 from Contracts.Contract_TestCases import TestExecution
-from Utilities.Data_Structures import TestResult, TestStatus, ComparisonResult
+from Utilities.Data_Structures import TestResult, TestStatus
 
 
 class Errors(TestExecution):
 
     def run_test(self):
-        url = self.site.url
-        self.driver.get(url)
-        logs = self.driver.get_log('browser') + self.driver.get_log('driver')
+        page_visit = self.visit_page()
+        logs = page_visit.browser_logs + page_visit.driver_logs
         error_logs = []
         for log in logs:
             if log['level'] in ['ERROR', 'SEVERE']:
@@ -30,9 +29,4 @@ class Errors(TestExecution):
             )
 
     def run_comparison(self, results):
-        return ComparisonResult(
-            Name="Console Errors",
-            Status=TestStatus.PASS,
-            Description="Console Error Compare",
-            Expected_Result=[]
-        )
+        return self.compare_envs(results, "Console Errors", "Console Error Compare")
@@ -0,0 +1,68 @@
+from typing import Optional
+
+import openpyxl
+import pandas as pd
+import pytest
+from pydantic import BaseModel
+
+import Contracts.Contract_File_IO as file_io
+from Contracts.Contract_File_IO import ExcelFileReader, FileImporter
+
+HEADER = ["name", "prod", "dev", "stage"]
+ROWS = [
+    ["site_a", "N/A", "null", 1],
+    ["NA", 1, 0, 0],
+    ["site_b", 0, "#N/A", "NULL"],
+    [None, None, None, None],
+    ["site_c", 1, "n/a", 0],
+]
+
+
+class SiteFlags(BaseModel):
+    name: str
+    prod: Optional[int] = None
+    dev: Optional[int] = None
+    stage: Optional[int] = None
+
+
+@pytest.fixture
+def na_sheet(tmp_path):
+    file_path = tmp_path / "flags.xlsx"
+    workbook = openpyxl.Workbook()
+    workbook.active.append(HEADER + ["notes"])
+    for row in ROWS:
+        workbook.active.append(row + ["x"])
+    workbook.save(file_path)
+    return str(file_path)
+
+
+def as_records(df: pd.DataFrame) -> list:
+    return df.astype(object).where(df.notna(), None).values.tolist()
+
+
+def test_streamed_cells_match_pandas_na_values(na_sheet):
+    expected = pd.read_excel(na_sheet, engine="openpyxl", usecols=HEADER)
+    streamed = pd.concat(list(ExcelFileReader().iter_chunks(na_sheet, chunksize=2, columns=HEADER)))
+    assert as_records(streamed) == as_records(expected)
+
+
+def test_import_reads_na_strings_as_missing(na_sheet, monkeypatch):
+    monkeypatch.setattr(file_io, "INPUT_CACHE_ENABLED", False)
+    models, errors = FileImporter(na_sheet)(SiteFlags)()
+    assert models == [
+        SiteFlags(name="site_a", prod=None, dev=None, stage=1),
+        SiteFlags(name="site_b", prod=0, dev=None, stage=None),
+        SiteFlags(name="site_c", prod=1, dev=None, stage=0),
+    ]
+    # "NA" is read as missing like pandas does, so the blank row and the site named "NA" have no name
+    assert [(error["row"], error["column"]) for error in errors] == [(2, "name"), (4, "name")]
+
+
+def test_header_error_lists_the_file_header(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_io, "INPUT_CACHE_ENABLED", False)
+    file_path = tmp_path / "flags.csv"
+    file_path.write_text("name,prod,dve,stage,notes\nsite_a,1,0,1,x\n")
+    with pytest.raises(ValueError, match=r"Found columns: \['name', 'prod', 'dve', 'stage', 'notes'\]"):
+        FileImporter(str(file_path))(SiteFlags)()
+    with pytest.raises(ValueError, match="'dve'"):
+        next(FileImporter(str(file_path))(SiteFlags).stream())
@@ -1,32 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
 import requests
 from Contracts.Contract_TestCases import TestExecution
-from Utilities.Data_Structures import TestResult, TestStatus, ComparisonResult
+from Utilities.Data_Structures import TestResult, TestStatus, Site
+from Utilities.Link_Checker import LinkChecker, LINK_CHECK_CONCURRENCY, LINK_CHECK_TIMEOUT
+
+PASS_STATUS_CODES = (404, 301)
 
 
 class PageNotFound(TestExecution):
+    probe_results: Dict[Tuple[str, str], dict] = {}  # (site name, env) -> outcome of the pre-flight probe
+
+    @staticmethod
+    def probe(site: Site) -> dict:
+        url = str(site.url) + "404"
+        try:
+            response = LinkChecker.session().get(url, allow_redirects=True, timeout=LINK_CHECK_TIMEOUT)
+        except requests.RequestException as e:
+            return {"url": url, "status_code": e.__class__.__name__, "redirects": [], "final_url": None}
+        chain = response.history + [response]
+        return {
+            "url": url,
+            "status_code": chain[0].status_code,
+            "redirects": [{"url": hop.url, "status_code": hop.status_code} for hop in response.history],
+            "final_url": response.url
+        }
+
+    @classmethod
+    def probe_all(cls, site_groups: List[List[Site]]) -> Dict[Tuple[str, str], dict]:
+        sites = [site for group in site_groups for site in group]
+        with ThreadPoolExecutor(max_workers=LINK_CHECK_CONCURRENCY) as executor:
+            outcomes = dict(zip(((site.name, site.env) for site in sites), executor.map(cls.probe, sites)))
+        cls.probe_results.update(outcomes)
+        return outcomes
 
     def run_test(self):
-        requests.get(str(self.site.url) + "404")
-        if requests.status_codes != (404, 301):
+        outcome = self.probe_results.pop((self.site.name, self.site.env), None) or self.probe(self.site)
+        if outcome["status_code"] not in PASS_STATUS_CODES:
             return TestResult(
                 Name="Page Not Found",
                 Status=TestStatus.FAIL,
                 Description="404 Fail",
-                Actual_Result=requests.status_codes
+                Actual_Result=outcome
             )
         else:
             return TestResult(
                 Name="Page Not Found",
                 Status=TestStatus.PASS,
                 Description="404 Pass",
-                Actual_Result=requests.status_codes
+                Actual_Result=outcome
             )
 
     def run_comparison(self, results):
-        # print("results", results)
-        return ComparisonResult(
-            Name="Page Not Found",
-            Status=TestStatus.PASS,
-            Description="Page Error Compare",
-            Expected_Result=[]
-        )
+        return self.compare_envs(results, "Page Not Found", "Page Error Compare")
@@ -1,37 +1,37 @@
 from abc import ABC
 
-import requests
-from selenium.webdriver.common.by import By
-
 from Contracts.Contract_TestCases import TestExecution
-from Utilities.Data_Structures import TestResult, TestStatus, ComparisonResult
+from Utilities.Data_Structures import TestResult, TestStatus
+from Utilities.Link_Cache import LinkStatusCache
+from Utilities.Link_Checker import LinkChecker, LINK_CHECK_CONCURRENCY
 
 
 class ResponseCode(TestExecution):
+    max_workers = LINK_CHECK_CONCURRENCY
 
     def run_test(self):
-        self.driver.get(self.site.url)
-        hyperlinks = self.driver.find_elements(By.TAG_NAME, "a")
-        links = [link.get_attribute('href') for link in hyperlinks if link.get_attribute('href')]
-        responses = {}
-        for link in links:
-            requests.get(str(link))
-            if requests.status_codes != 200:
-                responses[link] = requests.status_codes
+        links = [element['href'] for element in self.visit_page().links if element['href']]
+        link_cache = LinkStatusCache.shared()
+        statuses, missing = link_cache.lookup(link for link in links if LinkChecker.is_checkable(link))
+        fetched = LinkChecker(max_workers=self.max_workers).check_links(missing)
+        link_cache.set_many(fetched)
+        statuses.update(fetched)
+        responses = {link: status for link, status in statuses.items() if status != 200}
+        cache_stats = f"(link cache: {len(statuses) - len(fetched)} hits, {len(fetched)} misses)"
         if responses:
             return TestResult(
                 Name="Response Code",
                 Status=TestStatus.FAIL,
-                Description="Response Code Fail",
+                Description=f"Response Code Fail {cache_stats}",
                 Actual_Result=responses
             )
         else:
             return TestResult(
                 Name="Response Code",
                 Status=TestStatus.PASS,
-                Description="Response Code Pass",
+                Description=f"Response Code Pass {cache_stats}",
                 Actual_Result=responses
             )
 
     def run_comparison(self, results):
-        pass
+        return self.compare_envs(results, "Response Code", "Response Code Compare")
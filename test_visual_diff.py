@@ -0,0 +1,99 @@
+import hashlib
+import os
+
+import numpy as np
+from PIL import Image
+
+from Contracts.Contract_TestCases import TestExecution
+from Utilities.Data_Structures import TestResult, TestStatus, ComparisonResult, SiteEnv
+from Utilities.FilePath_Handler import OutputHandler
+
+# Per-channel difference below which a pixel is treated as unchanged (anti-aliasing, font rendering)
+VISUAL_PIXEL_TOLERANCE = int(os.environ.get("VISUAL_PIXEL_TOLERANCE", 16))
+# Changed area, in percent of the page, above which an env is flagged against prod
+VISUAL_DIFF_THRESHOLD = float(os.environ.get("VISUAL_DIFF_THRESHOLD", 1.0))
+
+
+class VisualDiff(TestExecution):
+
+    @staticmethod
+    def pixel_digest(img_path: str) -> str:
+        # Exact digest of the decoded pixels: equal digests are the only case where the pixel diff is skipped
+        with Image.open(img_path) as image:
+            image = image.convert("RGB")
+            return hashlib.sha256(f"{image.size}".encode("ascii") + image.tobytes()).hexdigest()
+
+    @staticmethod
+    def difference_hash(img_path: str, hash_size: int = 8) -> str:
+        # dHash: brightness gradient of a (hash_size+1) x hash_size grayscale thumbnail. Reported only; pages
+        # with a close or equal dHash can still differ a lot, e.g. by a light banner
+        with Image.open(img_path) as image:
+            pixels = np.asarray(image.convert("L").resize((hash_size + 1, hash_size)), dtype=np.int16)
+        bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+        return f"{int(''.join('1' if bit else '0' for bit in bits), 2):0{hash_size * hash_size // 4}x}"
+
+    @staticmethod
+    def hash_distance(first: str, second: str) -> int:
+        return bin(int(first, 16) ^ int(second, 16)).count("1")
+
+    @staticmethod
+    def pixel_diff(baseline_path: str, env_path: str, tolerance: int = VISUAL_PIXEL_TOLERANCE):
+        with Image.open(baseline_path) as baseline_image, Image.open(env_path) as env_image:
+            baseline = np.asarray(baseline_image.convert("RGB"), dtype=np.int16)
+            current = np.asarray(env_image.convert("RGB"), dtype=np.int16)
+        height, width = max(baseline.shape[0], current.shape[0]), max(baseline.shape[1], current.shape[1])
+        # Area covered by only one of the screenshots counts as changed
+        mask = np.ones((height, width), dtype=bool)
+        common_height, common_width = min(baseline.shape[0], current.shape[0]), min(baseline.shape[1], current.shape[1])
+        mask[:common_height, :common_width] = (np.abs(
+            baseline[:common_height, :common_width] - current[:common_height, :common_width]
+        ) > tolerance).any(axis=2)
+        return mask, float(mask.mean() * 100)
+
+    def run_test(self):
+        self.visit_page()
+        screenshot_path = self.capture_screenshot("visual_diff")
+        return TestResult(
+            Name="Visual Diff",
+            Status=TestStatus.PASS,
+            Description="Visual Diff Screenshot",
+            Actual_Result={"hash": self.difference_hash(screenshot_path),
+                           "pixels": self.pixel_digest(screenshot_path)},
+            Image=screenshot_path
+        )
+
+    def run_comparison(self, results):
+        screenshots = {env: next((item for item in items if item["Name"] == "Visual Diff"), None)
+                       for env, items in results.items()}
+        baseline = screenshots.get(SiteEnv.PRODUCTION.value)
+        if not baseline or not baseline.get("Image"):
+            return ComparisonResult(
+                Name="Visual Diff",
+                Status=TestStatus.ERROR,
+                Description="Visual Diff Compare: no prod screenshot to compare against",
+                Expected_Result={}
+            )
+
+        env_diffs = {}
+        for env, screenshot in screenshots.items():
+            if env == SiteEnv.PRODUCTION.value or not screenshot or not screenshot.get("Image"):
+                continue
+            distance = self.hash_distance(baseline["Actual_Result"]["hash"], screenshot["Actual_Result"]["hash"])
+            baseline_pixels = baseline["Actual_Result"].get("pixels")
+            if baseline_pixels and baseline_pixels == screenshot["Actual_Result"].get("pixels"):
+                env_diffs[env] = {"hash_distance": distance, "changed_percent": 0.0, "mask": None, "flagged": False}
+                continue
+            mask, changed_percent = self.pixel_diff(baseline["Image"], screenshot["Image"])
+            mask_path = OutputHandler.get_env_dir(self.site.name, env) / "visual_diff_mask.png"
+            Image.fromarray(mask.astype(np.uint8) * 255).save(mask_path)
+            env_diffs[env] = {"hash_distance": distance, "changed_percent": round(changed_percent, 2),
+                              "mask": str(mask_path), "flagged": changed_percent > VISUAL_DIFF_THRESHOLD}
+
+        flagged = [env for env, diff in env_diffs.items() if diff["flagged"]]
+        return ComparisonResult(
+            Name="Visual Diff",
+            Status=TestStatus.FAIL if flagged else TestStatus.PASS,
+            Description=f"Visual Diff Compare: {', '.join(flagged)} differ from prod" if flagged
+            else "Visual Diff Compare",
+            Expected_Result=env_diffs
+        )